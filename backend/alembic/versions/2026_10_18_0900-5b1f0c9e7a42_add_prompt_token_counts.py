@@ -0,0 +1,27 @@
+"""Add prompt token counts
+
+Revision ID: 5b1f0c9e7a42
+Revises: a25826741177
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c9e7a42'
+down_revision: Union[str, None] = 'a25826741177'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ai_models', sa.Column('encoding', sa.String(length=28), nullable=True))
+    op.add_column('gpt_prompts', sa.Column('en_prompt_tokens', sa.JSON(), server_default='{}', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('gpt_prompts', 'en_prompt_tokens')
+    op.drop_column('ai_models', 'encoding')
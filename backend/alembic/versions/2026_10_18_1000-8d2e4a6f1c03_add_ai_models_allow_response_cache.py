@@ -0,0 +1,25 @@
+"""Add ai_models.allow_response_cache
+
+Revision ID: 8d2e4a6f1c03
+Revises: 5b1f0c9e7a42
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4a6f1c03'
+down_revision: Union[str, None] = '5b1f0c9e7a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ai_models', sa.Column('allow_response_cache', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('ai_models', 'allow_response_cache')
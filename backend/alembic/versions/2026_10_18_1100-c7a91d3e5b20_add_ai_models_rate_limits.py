@@ -0,0 +1,27 @@
+"""Add ai_models rate limits
+
+Revision ID: c7a91d3e5b20
+Revises: 8d2e4a6f1c03
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a91d3e5b20'
+down_revision: Union[str, None] = '8d2e4a6f1c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ai_models', sa.Column('rpm_limit', sa.Integer(), nullable=True))
+    op.add_column('ai_models', sa.Column('tpm_limit', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ai_models', 'tpm_limit')
+    op.drop_column('ai_models', 'rpm_limit')
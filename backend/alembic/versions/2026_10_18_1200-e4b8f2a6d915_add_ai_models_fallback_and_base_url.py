@@ -0,0 +1,31 @@
+"""Add ai_models fallback model and base url
+
+Revision ID: e4b8f2a6d915
+Revises: c7a91d3e5b20
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8f2a6d915'
+down_revision: Union[str, None] = 'c7a91d3e5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ai_models', sa.Column('base_url', sa.String(length=255), nullable=True))
+    op.add_column('ai_models', sa.Column('fallback_model_id', sa.UUID(), nullable=True))
+    op.create_foreign_key(
+        'ai_models_fallback_model_id_fkey', 'ai_models', 'ai_models', ['fallback_model_id'], ['id'], ondelete='SET NULL'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('ai_models_fallback_model_id_fkey', 'ai_models', type_='foreignkey')
+    op.drop_column('ai_models', 'fallback_model_id')
+    op.drop_column('ai_models', 'base_url')
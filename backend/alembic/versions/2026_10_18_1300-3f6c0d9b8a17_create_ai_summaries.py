@@ -0,0 +1,39 @@
+"""Create ai_summaries
+
+Revision ID: 3f6c0d9b8a17
+Revises: e4b8f2a6d915
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c0d9b8a17'
+down_revision: Union[str, None] = 'e4b8f2a6d915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ai_summaries',
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('summary_tokens', sa.Integer(), nullable=False),
+    sa.Column('time_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('summarized_until', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('user_ai_model_id', sa.UUID(), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_ai_model_id'], ['user_ai_models.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_ai_model_id')
+    )
+    op.create_index(op.f('ix_ai_summaries_id'), 'ai_summaries', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ai_summaries_id'), table_name='ai_summaries')
+    op.drop_table('ai_summaries')
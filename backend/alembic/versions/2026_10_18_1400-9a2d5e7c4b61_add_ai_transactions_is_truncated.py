@@ -0,0 +1,25 @@
+"""Add ai_transactions is_truncated
+
+Revision ID: 9a2d5e7c4b61
+Revises: 3f6c0d9b8a17
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9a2d5e7c4b61'
+down_revision: Union[str, None] = '3f6c0d9b8a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ai_transactions', sa.Column('is_truncated', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('ai_transactions', 'is_truncated')
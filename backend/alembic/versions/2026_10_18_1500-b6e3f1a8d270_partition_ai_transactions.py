@@ -0,0 +1,86 @@
+"""Partition ai_transactions by month and index history lookups
+
+Revision ID: b6e3f1a8d270
+Revises: 9a2d5e7c4b61
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e3f1a8d270'
+down_revision: Union[str, None] = '9a2d5e7c4b61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 3
+
+CREATE_MONTHLY_PARTITION = """
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent regclass, month date) RETURNS text AS $$
+DECLARE
+    start_date date := date_trunc('month', month);
+    partition_name text := format('%s_%s', parent::text, to_char(start_date, 'YYYY_MM'));
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent, start_date, start_date + interval '1 month'
+        );
+    END IF;
+    RETURN partition_name;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def create_constraints(table: str) -> None:
+    op.create_foreign_key(
+        'ai_transactions_user_ai_model_id_fkey', table, 'user_ai_models', ['user_ai_model_id'], ['id'],
+        ondelete='SET NULL',
+    )
+    op.create_foreign_key('ai_transactions_user_id_fkey', table, 'users', ['user_id'], ['id'], ondelete='SET NULL')
+    op.create_index(op.f('ix_ai_transactions_id'), table, ['id'], unique=False)
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE ai_transactions RENAME TO ai_transactions_unpartitioned")
+    op.execute("ALTER TABLE ai_transactions_unpartitioned RENAME CONSTRAINT ai_transactions_pkey TO ai_transactions_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_ai_transactions_id RENAME TO ix_ai_transactions_unpartitioned_id")
+
+    op.execute(
+        "CREATE TABLE ai_transactions (LIKE ai_transactions_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.create_primary_key('ai_transactions_pkey', 'ai_transactions', ['id', 'created_at'])
+    create_constraints('ai_transactions')
+    op.create_index(
+        'ix_ai_transactions_user_ai_model_id_created_at', 'ai_transactions', ['user_ai_model_id', 'created_at'],
+        unique=False, postgresql_include=['question_tokens', 'answer_tokens'],
+    )
+
+    op.execute(CREATE_MONTHLY_PARTITION)
+    op.execute(f"""
+        SELECT create_monthly_partition('ai_transactions', month::date)
+        FROM generate_series(
+            date_trunc('month', coalesce((SELECT min(created_at) FROM ai_transactions_unpartitioned), now())),
+            date_trunc('month', now()) + interval '{PARTITIONS_AHEAD} months',
+            interval '1 month'
+        ) AS month
+    """)
+    op.execute("CREATE TABLE ai_transactions_default PARTITION OF ai_transactions DEFAULT")
+
+    op.execute("INSERT INTO ai_transactions SELECT * FROM ai_transactions_unpartitioned")
+    op.drop_table('ai_transactions_unpartitioned')
+
+
+def downgrade() -> None:
+    op.execute("CREATE TABLE ai_transactions_unpartitioned (LIKE ai_transactions INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO ai_transactions_unpartitioned SELECT * FROM ai_transactions")
+    op.drop_table('ai_transactions')
+    op.execute("DROP FUNCTION create_monthly_partition(regclass, date)")
+
+    op.rename_table('ai_transactions_unpartitioned', 'ai_transactions')
+    op.create_primary_key('ai_transactions_pkey', 'ai_transactions', ['id'])
+    create_constraints('ai_transactions')
@@ -0,0 +1,28 @@
+"""Add (created_at, id) indexes for cursor pagination
+
+Revision ID: d1a7c5e9f342
+Revises: b6e3f1a8d270
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1a7c5e9f342'
+down_revision: Union[str, None] = 'b6e3f1a8d270'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_images_created_at_id', 'images', ['created_at', 'id'], unique=False)
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('ix_ai_transactions_created_at_id', 'ai_transactions', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_transactions_created_at_id', table_name='ai_transactions')
+    op.drop_index('ix_users_created_at_id', table_name='users')
+    op.drop_index('ix_images_created_at_id', table_name='images')
@@ -0,0 +1,92 @@
+"""Move rows out of the default partition when creating a monthly partition
+
+Revision ID: e4b8c2d6f913
+Revises: d1a7c5e9f342
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8c2d6f913'
+down_revision: Union[str, None] = 'd1a7c5e9f342'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Секцию нельзя создать, пока в секции по умолчанию есть строки её месяца:
+# такие строки переносятся в новую секцию, созданную отдельной таблицей и затем присоединённую.
+CREATE_MONTHLY_PARTITION = """
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent regclass, month date) RETURNS text AS $$
+DECLARE
+    start_date date := date_trunc('month', month);
+    end_date date := date_trunc('month', month) + interval '1 month';
+    partition_name text := format('%s_%s', parent::text, to_char(start_date, 'YYYY_MM'));
+    default_name text := format('%s_default', parent::text);
+    key_column text;
+    has_rows boolean := false;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    SELECT a.attname INTO key_column
+    FROM pg_partitioned_table p
+    JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+    WHERE p.partrelid = parent;
+
+    IF to_regclass(default_name) IS NOT NULL THEN
+        EXECUTE format('LOCK TABLE %I IN EXCLUSIVE MODE', default_name);
+        EXECUTE format(
+            'SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+            default_name, key_column, start_date, key_column, end_date
+        ) INTO has_rows;
+    END IF;
+
+    IF NOT has_rows THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent, start_date, end_date
+        );
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name, parent);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+        default_name, key_column, start_date, key_column, end_date, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE %s ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        parent, partition_name, start_date, end_date
+    );
+    RETURN partition_name;
+END
+$$ LANGUAGE plpgsql
+"""
+
+PREVIOUS_CREATE_MONTHLY_PARTITION = """
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent regclass, month date) RETURNS text AS $$
+DECLARE
+    start_date date := date_trunc('month', month);
+    partition_name text := format('%s_%s', parent::text, to_char(start_date, 'YYYY_MM'));
+BEGIN
+    IF to_regclass(partition_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent, start_date, start_date + interval '1 month'
+        );
+    END IF;
+    RETURN partition_name;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.execute(CREATE_MONTHLY_PARTITION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_CREATE_MONTHLY_PARTITION)
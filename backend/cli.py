@@ -310,6 +310,130 @@ async def create_superuser():
             typer.echo(f"Ошибка при создании суперпользователя: {e}", err=True)
 
 
+async def backfill_prompt_tokens():
+    """
+    Команда для пересчёта кодировок моделей ИИ и количества токенов в промптах.
+    """
+    from src.ai.gpt.tokenizer import TokenCounter
+    from src.crud import ai_model_dao, gpt_prompt_dao
+    from src.db.deps import get_async_session
+
+    async for session in get_async_session():
+        ai_models = await ai_model_dao.get_multi(limit=None, db_session=session)
+        for ai_model in ai_models:
+            encoding = await TokenCounter.get_encoding(ai_model.title_model)
+            ai_model.encoding = encoding.name
+
+        encodings = {ai_model.encoding for ai_model in ai_models}
+        prompts = await gpt_prompt_dao.get_multi(limit=None, db_session=session)
+        for prompt in prompts:
+            prompt.en_prompt_tokens = await TokenCounter.count_by_encodings(prompt.en_prompt_text, encodings)
+
+        await session.commit()
+        typer.echo(f"Количество токенов пересчитано для {len(prompts)} промптов.")
+
+
+async def benchmark_bulk_crud(rows: int = 1000):
+    """
+    Команда для сравнения построчных create/update GenericCRUD с bulk_create/bulk_upsert/bulk_update
+    на таблице групп Телеграм. Тестовые группы удаляются после замера.
+    """
+    import time
+
+    from sqlalchemy import delete
+    from src.crud import tg_group_dao
+    from src.db.deps import get_async_session
+    from src.models import TgGroup
+    from src.schemas.tg_group_schema import TgGroupCreate
+
+    first_chat_id = -10 ** 15      # вне диапазона id реальных чатов
+    objs_in = [TgGroupCreate(chat_id=first_chat_id - index, title=f"bench {index}") for index in range(rows)]
+    chat_ids = [obj.chat_id for obj in objs_in]
+
+    async for session in get_async_session():
+        async def cleanup():
+            await session.execute(delete(TgGroup).where(TgGroup.chat_id.in_(chat_ids)))
+            await session.commit()
+
+        timings = {}
+        try:
+            start = time.perf_counter()
+            groups = [await tg_group_dao.create(obj_in=obj_in, db_session=session) for obj_in in objs_in]
+            timings['create'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for group in groups:
+                await tg_group_dao.update(obj_current=group, obj_new={'title': f"{group.title} updated"}, db_session=session)
+            timings['update'] = time.perf_counter() - start
+            await cleanup()
+
+            start = time.perf_counter()
+            groups = await tg_group_dao.bulk_create(objs_in=objs_in, db_session=session)
+            timings['bulk_create'] = time.perf_counter() - start
+            await cleanup()
+
+            start = time.perf_counter()
+            await tg_group_dao.bulk_create(objs_in=objs_in, return_objects=False, db_session=session)
+            timings['bulk_create (rows)'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await tg_group_dao.bulk_upsert(objs_in=objs_in, conflict_key=['chat_id'], db_session=session)
+            timings['bulk_upsert'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await tg_group_dao.bulk_update(
+                objs_in=[{'chat_id': chat_id, 'title': 'updated'} for chat_id in chat_ids], key='chat_id',
+                db_session=session,
+            )
+            timings['bulk_update'] = time.perf_counter() - start
+        finally:
+            await cleanup()
+
+        for name, elapsed in timings.items():
+            typer.echo(f"{name:<20} {rows} строк: {elapsed * 1000:9.1f} мс, {rows / elapsed:9.0f} строк/с")
+
+
+async def benchmark_pagination(page: int = 10000, size: int = 20):
+    """
+    Команда для сравнения постраничного вывода get_multi_paginated (OFFSET и count(*))
+    с get_multi_by_cursor на странице `page`.
+    """
+    import time
+
+    from fastapi_pagination import Params, set_page
+    from fastapi_pagination.default import Page
+    from sqlalchemy import select
+    from src.crud import ai_transaction_dao, image_dao, user_dao
+    from src.crud.base_crud import GenericCRUD
+    from src.db.deps import get_async_session
+
+    set_page(Page)
+    async for session in get_async_session():
+        for dao in (image_dao, user_dao, ai_transaction_dao):
+            query = select(dao.model).order_by(dao.model.created_at.desc(), dao.model.id.desc())
+
+            start = time.perf_counter()
+            await GenericCRUD.get_multi_paginated(dao, params=Params(page=page, size=size), query=query, db_session=session)
+            offset_elapsed = time.perf_counter() - start
+
+            # курсор на конец предыдущей страницы, как после последовательного перехода по страницам
+            result = await session.execute(query.offset((page - 1) * size - 1).limit(1))
+            previous = result.scalars().first()
+            if previous is None:
+                typer.echo(f"{dao.model.__tablename__:<16} меньше {page} страниц по {size} записей")
+                continue
+            cursor = dao.encode_cursor(previous)
+
+            start = time.perf_counter()
+            await GenericCRUD.get_multi_by_cursor(dao, cursor=cursor, limit=size, db_session=session)
+            cursor_elapsed = time.perf_counter() - start
+
+            typer.echo(
+                f"{dao.model.__tablename__:<16} страница {page}: offset {offset_elapsed * 1000:9.1f} мс, "
+                f"cursor {cursor_elapsed * 1000:9.1f} мс"
+            )
+
+
 if __name__ == "__main__":
     db_manager = AsyncDatabaseManager()
     created_new_loop = False
@@ -322,7 +446,10 @@ if __name__ == "__main__":
             asyncio.set_event_loop(loop)
             created_new_loop = True
 
-        if len(sys.argv) > 1 and sys.argv[1] in ('restore_database', 'dump_db', 'create_superuser'):
+        if len(sys.argv) > 1 and sys.argv[1] in (
+            'restore_database', 'dump_db', 'create_superuser', 'backfill_prompt_tokens', 'benchmark_bulk_crud',
+            'benchmark_pagination',
+        ):
             command = sys.argv[1]
             try:
                 if command == 'restore_database':
@@ -331,6 +458,14 @@ if __name__ == "__main__":
                     loop.run_until_complete(db_manager.dump_db())
                 elif command == 'create_superuser':
                     loop.run_until_complete(create_superuser())
+                elif command == 'backfill_prompt_tokens':
+                    loop.run_until_complete(backfill_prompt_tokens())
+                elif command == 'benchmark_bulk_crud':
+                    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+                    loop.run_until_complete(benchmark_bulk_crud(rows))
+                elif command == 'benchmark_pagination':
+                    page = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+                    loop.run_until_complete(benchmark_pagination(page))
             except Exception as e:
                 logger.error(f"Ошибка выполнения команды {command}: {e}")
                 sys.exit(1)
@@ -1,11 +1,14 @@
-from sqladmin import ModelView
+from src.admin.base import CountModelView
+from src.ai.gpt.tokenizer import TokenCounter
+from src.crud import ai_model_dao
+from src.db.deps import get_async_session
 from src.models import AIModels, GPTPrompt
 from src.schemas.common_schema import (get_consumer_choices,
                                        get_provider_choices)
 from wtforms import DecimalField, SelectField
 
 
-class AIModelsAdmin(ModelView, model=AIModels):
+class AIModelsAdmin(CountModelView, model=AIModels):
     name = "Модель ИИ"
     name_plural = "Модели ИИ"
     column_list = [
@@ -14,13 +17,18 @@ class AIModelsAdmin(ModelView, model=AIModels):
         AIModels.title_public,
         AIModels.title_model,
         AIModels.api_key,
+        AIModels.base_url,
         AIModels.is_default,
         AIModels.is_free,
+        AIModels.allow_response_cache,
         AIModels.incoming_price,
         AIModels.outgoing_price,
         AIModels.context_window,
         AIModels.max_request_token,
         AIModels.time_window,
+        AIModels.rpm_limit,
+        AIModels.tpm_limit,
+        AIModels.fallback_model,
         AIModels.consumer,
     ]
     column_labels = {
@@ -29,13 +37,18 @@ class AIModelsAdmin(ModelView, model=AIModels):
         AIModels.title_public: "Публичное название",
         AIModels.title_model: "Название модели",
         AIModels.api_key: "API ключ",
+        AIModels.base_url: "URL API",
         AIModels.is_default: "По умолчанию",
         AIModels.is_free: "Бесплатная",
+        AIModels.allow_response_cache: "Кешировать ответы",
         AIModels.incoming_price: "Стоимость входящих токенов",
         AIModels.outgoing_price: "Стоимость исходящих токенов",
         AIModels.context_window: "Контекстное окно",
         AIModels.max_request_token: "Максимум токенов",
         AIModels.time_window: "Окно времени",
+        AIModels.rpm_limit: "Лимит запросов в минуту",
+        AIModels.tpm_limit: "Лимит токенов в минуту",
+        AIModels.fallback_model: "Резервная модель",
         AIModels.consumer: "Потребитель",
     }
 
@@ -57,13 +70,18 @@ class AIModelsAdmin(ModelView, model=AIModels):
         'title_public',
         'title_model',
         'api_key',
+        'base_url',
         'is_default',
         'is_free',
+        'allow_response_cache',
         'incoming_price',
         'outgoing_price',
         'context_window',
         'max_request_token',
         'time_window',
+        'rpm_limit',
+        'tpm_limit',
+        'fallback_model',
         'consumer',
     ]
     form_overrides = {
@@ -83,8 +101,15 @@ class AIModelsAdmin(ModelView, model=AIModels):
         },
     }
 
+    async def on_model_change(self, data, model, is_created, request):
+        """Сохраняет кодировку токенизатора для модели."""
+        title_model = data.get('title_model') or model.title_model
+        if title_model:
+            encoding = await TokenCounter.get_encoding(title_model)
+            data['encoding'] = encoding.name
 
-class GPTPromptAdmin(ModelView, model=GPTPrompt):
+
+class GPTPromptAdmin(CountModelView, model=GPTPrompt):
     name = "Промпт ИИ"
     name_plural = "Промпты ИИ"
     column_list = [
@@ -129,3 +154,12 @@ class GPTPromptAdmin(ModelView, model=GPTPrompt):
             'label': 'Потребитель',
         },
     }
+
+    async def on_model_change(self, data, model, is_created, request):
+        """Пересчитывает количество токенов промпта для всех используемых кодировок."""
+        en_prompt_text = data.get('en_prompt_text')
+        if en_prompt_text is None:
+            return
+        async for session in get_async_session():
+            encodings = await ai_model_dao.get_encodings(db_session=session)
+        data['en_prompt_tokens'] = await TokenCounter.count_by_encodings(en_prompt_text, encodings)
@@ -0,0 +1,19 @@
+from sqladmin import ModelView
+from sqlalchemy import select
+from sqlalchemy.sql.selectable import Select, Subquery
+from src.db.counter import RowCounter
+from src.db.session import async_session
+from starlette.requests import Request
+
+
+class CountModelView(ModelView):
+    """Представление, считающее строки списка через `RowCounter` вместо `count(*)` по всей таблице."""
+
+    async def count(self, request: Request, stmt: Select | None = None) -> int:
+        froms = stmt.get_final_froms() if stmt is not None else []
+        if len(froms) == 1 and isinstance(froms[0], Subquery):
+            query = froms[0].element
+        else:
+            query = select(self.model)
+        async with async_session() as session:
+            return await RowCounter.count(query, session)
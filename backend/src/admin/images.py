@@ -1,8 +1,8 @@
-from sqladmin import ModelView
+from src.admin.base import CountModelView
 from src.models import Image
 
 
-class ImageAdmin(ModelView, model=Image):
+class ImageAdmin(CountModelView, model=Image):
     can_create = False
     can_edit = False
     can_delete = False
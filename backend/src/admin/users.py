@@ -1,8 +1,8 @@
-from sqladmin import ModelView
+from src.admin.base import CountModelView
 from src.models import User
 
 
-class UserAdmin(ModelView, model=User):
+class UserAdmin(CountModelView, model=User):
     can_create = True
     can_edit = True
     can_delete = True
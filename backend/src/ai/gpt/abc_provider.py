@@ -1,25 +1,40 @@
 import asyncio
+import html
+import io
+import re
 from abc import ABC, abstractmethod
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Dict, Set, Type
+from typing import Any, Dict, Iterator, Set, Type
 from uuid import UUID
 
-import markdown
-from bs4 import BeautifulSoup
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeMeta
-from src.ai.gpt.exception import InWorkError, LongQueryError, handle_exceptions
+from src.ai.gpt.context_cache import ConversationCache
+from src.ai.gpt.exception import LongQueryError, handle_exceptions
+from src.ai.gpt.history_writer import history_writer
+from src.ai.gpt.inflight import InFlightRequest
+from src.ai.gpt.rate_limiter import RateLimiter
+from src.ai.gpt.response_cache import ResponseCache
+from src.ai.gpt.streaming import (BaseStreamer, DeltaWebSocketStreamer,
+                                  TelegramStreamer, WebSocketStreamer)
+from src.ai.gpt.summarizer import ConversationSummarizer
+from src.conf import settings
 from src.conf.redis import AsyncRedisClient
-from src.crud import (ai_model_dao, ai_transaction_dao, gpt_prompt_dao,
-                      user_ai_model_dao)
+from src.crud import (ai_model_dao, ai_summary_dao, ai_transaction_dao,
+                      gpt_prompt_dao, user_ai_model_dao)
 from src.db.deps import get_async_session
 from src.models.ai_model import AIModels
+from src.models.ai_summary_model import AISummary
 from src.models.user_model import User
 from src.schemas.ai_transaction_schema import AITransactionCreate
-from src.schemas.common_schema import ConsumerEnum
+from src.schemas.common_schema import ConsumerEnum, StreamModeEnum
+from src.tasks.summary_tasks import summarize_conversation_task
 from src.tgbot.loader import bot
-from src.utils.re_compile import PUNCTUATION_RE
+from src.tgbot.services.typing_scheduler import typing_scheduler
+from src.utils.re_compile import (MARKDOWN_BLOCK_RE, MARKDOWN_FENCE_RE,
+                                  MARKDOWN_HTML_BLOCK_RE, MARKDOWN_INLINE_RE,
+                                  MARKDOWN_RAW_TEXT_RE, PUNCTUATION_RE)
 from src.websocket import manager
 
 
@@ -49,7 +64,8 @@ class BaseAIProvider(ABCProvider):
     def __init__(
         self, query_text: str, user: Type[DeclarativeMeta],
         chat_id: int | UUID = None, creativity_controls: Dict[str, Any] = {},
-        consumer: Enum = ConsumerEnum.FAST_CHAT, stream: bool = False, tg_chat: bool = True
+        consumer: Enum = ConsumerEnum.FAST_CHAT, stream: bool = False, tg_chat: bool = True,
+        stream_mode: StreamModeEnum = StreamModeEnum.FULL,
     ) -> None:
         # Инициализация свойств класса
         self.user: User = user                    # модель пользователя пославшего запрос
@@ -58,6 +74,8 @@ class BaseAIProvider(ABCProvider):
         self.creativity_controls: dict = creativity_controls      # параметры которые контролируют креативность и разнообразие текста
         self.consumer: ConsumerEnum = consumer            # потребитель запроса для истории
         self.stream = stream
+        self.tg_chat = tg_chat             # запрос из чата Телеграм
+        self.stream_mode = stream_mode     # протокол потоковой передачи в веб-сокет
 
         # Дополнительные свойства
         self.query_text_tokens: int = 0       # количество токенов в запросе
@@ -66,8 +84,10 @@ class BaseAIProvider(ABCProvider):
         self.all_prompt: list = []                # общий промпт для запроса
         self.current_time = datetime.now(timezone.utc)  # текущее время для окна истории
         self.time_start = None              # время начала для окна истории
-        self.event = asyncio.Event() if tg_chat else None  # typing в чат пользователя
+        self.typing_token: int | None = None  # токен запроса в планировщике typing чата пользователя
         self.model: AIModels | None = None                   # активная модель пользователя
+        self.fallback_model: AIModels | None = None          # резервная модель для переключения и хеджирования
+        self.answer_model: AIModels | None = None            # модель, давшая ответ
         self.assist_prompt = None           # активный системный промпт пользователя
         self.return_text = ''               # текст полученный в ответе от модели
         self.reply_to_message_text = None   # текст в случает запроса на ответ GPT
@@ -75,23 +95,84 @@ class BaseAIProvider(ABCProvider):
         self.redis_client = AsyncRedisClient.get_client()
         self.ws_manager = manager if stream else None
         self.history_crud = ai_transaction_dao
+        self.response_cache = ResponseCache()
+        self.rate_limiter = RateLimiter()
+        self.stream_reservation: tuple[AIModels, int] | None = None   # модель открытого потока и резерв её токенов
+        self.inflight = InFlightRequest(chat_id, query_text)
+        self.cache_hit = False              # ответ получен из кеша ответов без запроса к модели
+        self.streamed = False               # ответ доставлен получателю потоком
+        self.is_truncated = False           # генерация прервана, получатель отключился
 
     @property
     def check_long_query(self) -> bool:
         return self.query_text_tokens > self.model.max_request_token
 
     @staticmethod
-    def clean_and_split_text(text: str, word_limit=15) -> Set:
+    def _strip_inline(match: re.Match) -> str:
+        if match.group('entity'):
+            return html.unescape(match.group('entity'))
+        return match.group('code') or match.group('link') or match.group('autolink') or ''
+
+    @staticmethod
+    def _strip_raw_text(line: str, raw_text_end: str | None) -> tuple[str, str | None]:
+        """Вырезает содержимое `<script>` и `<style>`, которое может продолжаться на следующих строках."""
+        if raw_text_end is not None:
+            end = line.find(raw_text_end)
+            if end < 0:
+                return '', raw_text_end
+            line = line[line.find('>', end) + 1:]
+        opened = MARKDOWN_RAW_TEXT_RE.search(line)
+        if opened is None:
+            return line, None
+        return line[:opened.start()], f'</{opened.group(1)}'
+
+    @classmethod
+    def _plain_text_lines(cls, text: str) -> Iterator[str]:
+        """
+        Построчно возвращает текст без Markdown и HTML разметки так, как его выводит `markdown` + `BeautifulSoup`.
+
+        Без расширения fenced_code блок ``` разбирается как встроенный код: язык и содержимое блока
+        остаются текстом, разметкой считается только HTML-блок внутри него. Маркер нумерованного списка снимается
+        только в начале блока или внутри списка.
+        """
+        fenced = raw_html = list_block = False
+        block_start = True
+        raw_text_end = None
+        for line in io.StringIO(text):
+            fence = MARKDOWN_FENCE_RE.match(line)
+            if fence:
+                fenced, raw_html, block_start = not fenced, False, False
+                yield line[fence.end():]
+                continue
+            if not line.strip():
+                block_start = True
+                continue
+            if fenced:
+                raw_html = raw_html or bool(MARKDOWN_HTML_BLOCK_RE.match(line))
+                if not raw_html:
+                    yield line
+                    continue
+            elif block_start or list_block:
+                marker = MARKDOWN_BLOCK_RE.match(line)
+                if block_start:
+                    list_block = bool(marker.group().strip(' \t\n>'))
+                line = line[marker.end():]
+            block_start = False
+            line, raw_text_end = cls._strip_raw_text(line, raw_text_end)
+            yield MARKDOWN_INLINE_RE.sub(cls._strip_inline, line)
+
+    @classmethod
+    def clean_and_split_text(cls, text: str, word_limit=15) -> Set:
         """
         Функция для удаления HTML и Markdown разметки и очистки текста от знаков препинания.
         Возвращает множество по умолчанию до 15 первых уникальных слов.
+        Текст разбирается построчно за один проход и только до набора `word_limit` слов.
         """
-        html_text = markdown.markdown(text)
-        soup = BeautifulSoup(html_text, "html.parser")
-        clean_text = soup.get_text()
-
-        clean_text = PUNCTUATION_RE.sub('', clean_text)
-        words = clean_text.split()
+        words = []
+        for line in cls._plain_text_lines(text):
+            words.extend(PUNCTUATION_RE.sub('', line).split())
+            if len(words) >= word_limit:
+                break
 
         return set(words[:word_limit])
 
@@ -110,34 +191,103 @@ class BaseAIProvider(ABCProvider):
         self.model = config_source.get("model") if isinstance(config_source, dict) else config_source.model
         self.assist_prompt = config_source.get("prompt") if isinstance(config_source, dict) else config_source.prompt
         self.time_start = config_source.get("time_start") if isinstance(config_source, dict) else config_source.time_start
+        if self.model.fallback_model_id:
+            self.fallback_model = await ai_model_dao.get(id=self.model.fallback_model_id, db_session=session)
+
+    async def get_assist_prompt_tokens(self) -> int:
+        """
+        Возвращает количество токенов системного промпта.
+        Берёт предрассчитанное значение для кодировки модели, иначе считает токены.
+        """
+        prompt_tokens = self.assist_prompt.en_prompt_tokens or {}
+        tokens = prompt_tokens.get(self.model.encoding)
+        if tokens is None:
+            return await self.num_tokens(self.assist_prompt.en_prompt_text, 7)
+        return tokens + 7
 
     async def create_history(self):
+        answer_model = self.answer_model or self.model
         obj_in = AITransactionCreate(
             user_id=self.user.id if self.user else None,
             chat_id=str(self.chat_id),
             question=self.query_text,
             question_tokens=self.query_text_tokens,
-            question_token_price=self.model.outgoing_price,
+            question_token_price=0 if self.cache_hit else answer_model.outgoing_price,
             answer=self.return_text,
             answer_tokens=self.return_text_tokens,
-            answer_token_price=self.model.incoming_price,
+            answer_token_price=0 if self.cache_hit else answer_model.incoming_price,
             consumer=self.consumer,
-            user_ai_model_id=self.active_model.id if self.active_model else None
+            user_ai_model_id=self.active_model.id if self.active_model else None,
+            is_truncated=self.is_truncated,
         )
-        async for session in get_async_session():
-            await self.history_crud.create(obj_in=obj_in, db_session=session)
+        row = await history_writer.put(obj_in)
+
+        if self.active_model:
+            cache = ConversationCache(self.active_model)
+            await cache.add_pending(row)
+            await cache.append(row, self.model.context_window)
+
+    def get_streamer(self) -> BaseStreamer:
+        """Возвращает получателя потокового ответа согласно протоколу запроса."""
+        if self.tg_chat:
+            return TelegramStreamer(bot, self.chat_id)
+        if self.stream_mode == StreamModeEnum.DELTA:
+            return DeltaWebSocketStreamer(self.ws_manager, self.chat_id)
+        return WebSocketStreamer(self.ws_manager, self.chat_id)
+
+    async def get_summary(self, session: AsyncSession) -> AISummary | None:
+        """Возвращает сводку старых ходов диалога, если сжатие истории включено."""
+        if not settings.GPT_SUMMARY_ENABLED:
+            return None
+        return await ai_summary_dao.get_actual(self.active_model, db_session=session)
+
+    async def schedule_summary(self) -> None:
+        """Ставит задачу сжатия истории, если запрос с историей превысил порог контекстного окна."""
+        if not settings.GPT_SUMMARY_ENABLED or not self.active_model or self.cache_hit:
+            return
+        used_tokens = self.query_text_tokens + self.return_text_tokens
+        if used_tokens < self.model.context_window * settings.GPT_SUMMARY_THRESHOLD:
+            return
+        if await ConversationSummarizer.lock(self.active_model.id):
+            try:
+                await summarize_conversation_task.kiq(user_ai_model_id=self.active_model.id)
+            except Exception:
+                await ConversationSummarizer.unlock(self.active_model.id)
+                raise
+
+    async def get_history(self, session: AsyncSession, token_budget: int, since: datetime | None = None) -> list[dict]:
+        """
+        Возвращает историю диалога, укладывающуюся в бюджет токенов.
+        Сначала читает кеш диалога в Redis, при промахе загружает историю из Postgres и прогревает кеш.
+        При заданном `since` возвращаются только ходы после него (не вошедшие в сводку).
+        """
+        cache = ConversationCache(self.active_model)
+        history = await cache.get()
+        if history is None:
+            history = await self.history_crud.get_history(
+                user_ai_model_id=self.active_model.id, time_start=self.time_start, current_time=self.current_time,
+                token_budget=self.model.context_window, db_session=session
+            )
+            await cache.fill(history)
+        if since:
+            history = [item for item in history if item['created_at'] > since]
+        return cache.fit_budget(history, token_budget)
 
     async def get_gpt_response(self) -> dict:
         """Основная логика."""
         try:
+            inflight_result = await self.check_in_works()
+            if inflight_result is not None:
+                self.load_result(inflight_result)
+                return
+
             async for session in get_async_session():
 
                 await self.init_model_config(session)
 
-                self.query_text_tokens, self.assist_prompt_tokens, _ = await asyncio.gather(
+                self.query_text_tokens, self.assist_prompt_tokens = await asyncio.gather(
                     self.num_tokens(self.query_text, 4),
-                    self.num_tokens(self.assist_prompt.en_prompt_text, 7),
-                    self.check_in_works(),
+                    self.get_assist_prompt_tokens(),
                 )
 
                 if self.check_long_query:
@@ -145,17 +295,19 @@ class BaseAIProvider(ABCProvider):
                         'Слишком большой текст запроса.\nПопробуйте сформулировать его короче.'
                     )
 
-                if self.event:
-                    asyncio.create_task(self.send_typing_periodically_for_tg_bot())
+                if self.tg_chat:
+                    self.typing_token = typing_scheduler.add(self.chat_id, self.MAX_TYPING_TIME * 60)
 
                 await self.get_prompt(session)
 
-            if self.stream and self.is_valid_uuid(self.chat_id):
-                await self.stream_request()
-            else:
-                await self.httpx_request()
+            await self.request()
+
+            if not self.is_truncated:
+                await self.inflight.publish(self.dump_result())
 
-            asyncio.create_task(self.create_history())
+            await self.create_history()
+
+            await self.schedule_summary()
 
             await self.response_processing()
 
@@ -164,8 +316,56 @@ class BaseAIProvider(ABCProvider):
             raise type_err(f'\n\n{str(err)}{traceback_str}')
         finally:
             await self.del_mess_in_redis()
-            if self.event:
-                self.event.set()
+            if self.typing_token is not None:
+                typing_scheduler.remove(self.chat_id, self.typing_token)
+
+    async def request(self) -> None:
+        """Получает ответ модели из кеша ответов или запросом к провайдеру."""
+        cache_key = None
+        if ResponseCache.is_cacheable(self.model, self.creativity_controls):
+            cache_key = ResponseCache.make_key(self.model, self.assist_prompt.id, self.all_prompt, self.creativity_controls)
+            cached = await self.response_cache.get(cache_key)
+            if cached:
+                await self.use_cached_response(cached)
+                return
+
+        if self.stream and (self.tg_chat or self.is_valid_uuid(self.chat_id)):
+            await self.stream_request()
+        else:
+            await self.httpx_request()
+
+        if cache_key and self.return_text and not self.is_truncated:
+            await self.response_cache.set(cache_key, self.dump_result())
+
+    @property
+    def estimated_tokens(self) -> int:
+        """Оценка токенов запроса для резерва в лимитере модели."""
+        return self.query_text_tokens + self.creativity_controls.get('max_tokens', 0)
+
+    def dump_result(self) -> dict:
+        """Возвращает ответ модели для кеша ответов и ожидающих повторных запросов."""
+        return {
+            'text': self.return_text,
+            'query_text_tokens': self.query_text_tokens,
+            'return_text_tokens': self.return_text_tokens,
+        }
+
+    def load_result(self, data: dict) -> None:
+        """Подставляет ответ, полученный без запроса к модели."""
+        self.return_text = data['text']
+        self.query_text_tokens = data['query_text_tokens']
+        self.return_text_tokens = data['return_text_tokens']
+
+    async def use_cached_response(self, cached: dict) -> None:
+        """Подставляет ответ из кеша и передаёт его в веб-сокет одним кадром."""
+        self.cache_hit = True
+        self.load_result(cached)
+        if self.stream:
+            streamer = self.get_streamer()
+            await streamer.start()
+            await streamer.push(self.return_text, self.return_text)
+            await streamer.finish(self.return_text)
+            self.streamed = True
 
     async def response_processing(self):
         pass
@@ -196,25 +396,16 @@ class BaseAIProvider(ABCProvider):
         """Добавляет элемент в список all_prompt."""
         self.all_prompt.append({'role': role, 'content': content})
 
-    async def send_typing_periodically_for_tg_bot(self) -> None:
-        """"Передаёт TYPING в чат Телеграм откуда пришёл запрос."""
-        time_stop = datetime.now() + timedelta(minutes=self.MAX_TYPING_TIME)
-        while not self.event.is_set():
-            await bot.send_chat_action(chat_id=self.chat_id, action='typing')
-            await asyncio.sleep(2)
-            if datetime.now() > time_stop:
-                break
-
-    async def check_in_works(self) -> bool:
-        """Проверяет нет ли уже в работе этого запроса в Redis и добавляет его."""
-        queries = await self.redis_client.lrange(f'gpt_user:{self.chat_id}', 0, -1)
-        if self.query_text in queries:
-            raise InWorkError('Запрос уже находится в работе.')
-        await self.redis_client.lpush(f'gpt_user:{self.chat_id}', self.query_text)
+    async def check_in_works(self) -> dict | None:
+        """
+        Регистрирует запрос в работе в Redis.
+        Если такой же запрос уже в работе, ожидает и возвращает его результат.
+        """
+        return await self.inflight.join()
 
     async def del_mess_in_redis(self) -> None:
-        """Удаляет входящее сообщение из Redis."""
-        await self.redis_client.lrem(f'gpt_user:{self.chat_id}', 1, self.query_text.encode('utf-8'))
+        """Снимает регистрацию запроса в работе."""
+        await self.inflight.release()
 
     async def finite_tokens(self):
         all_prompt_text = "".join(["".join(["{}: {}".format(key, value) for key, value in item.items()]) for item in self.all_prompt])
@@ -0,0 +1,58 @@
+from importlib.util import find_spec
+from typing import Dict, Tuple
+
+import httpx
+import openai
+from httpx_socks import AsyncProxyTransport
+from src.conf import logger, settings
+
+logger = logger.getChild(__name__)
+
+HTTP2_AVAILABLE = find_spec("h2") is not None
+
+
+class OpenAIClientRegistry:
+    """
+    Реестр долгоживущих клиентов OpenAI на процесс.
+
+    Клиенты кешируются по ключу (api_key, proxy, base_url), поэтому SOCKS и TLS соединения
+    переиспользуются между запросами через keep-alive пул httpx.
+    """
+    _clients: Dict[Tuple[str, str | None, str | None], openai.AsyncOpenAI] = {}
+
+    @staticmethod
+    def _build_transport(proxy: str | None) -> httpx.AsyncBaseTransport:
+        http2 = settings.OPENAI_HTTP2 and HTTP2_AVAILABLE
+        limits = httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+        )
+        if proxy:
+            return AsyncProxyTransport.from_url(proxy, http2=http2, limits=limits)
+        return httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+
+    @classmethod
+    def get_client(cls, api_key: str, proxy: str | None = None, base_url: str | None = None) -> openai.AsyncOpenAI:
+        """
+        Возвращает клиента для (api_key, proxy, base_url), создавая его при первом обращении.
+        `base_url` задаёт OpenAI-совместимый API, по умолчанию используется API OpenAI.
+        """
+        key = (api_key, proxy, base_url)
+        client = cls._clients.get(key)
+        if client is None or client.is_closed():
+            http_client = httpx.AsyncClient(transport=cls._build_transport(proxy))
+            client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            cls._clients[key] = client
+            logger.info(f"OpenAI client is created, clients in registry: {len(cls._clients)}")
+        return client
+
+    @classmethod
+    async def close(cls) -> None:
+        """Закрывает все клиенты и их пулы соединений."""
+        clients, cls._clients = cls._clients, {}
+        for client in clients.values():
+            try:
+                await client.close()
+            except Exception as err:
+                logger.error(f"Failed to close OpenAI client: {err}")
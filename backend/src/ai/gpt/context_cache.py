@@ -0,0 +1,137 @@
+import json
+import uuid
+from datetime import datetime
+from typing import List
+
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+from src.models import UserAIModel
+
+HISTORY_ITEM_TOKENS = 11  # токены для ролей и разделителей: 'system' - 7 'user' - 4
+
+
+class ConversationCache:
+    """
+    Кеш последних ходов диалога пользователя в Redis.
+
+    Ключ включает `user_ai_model.id`, модель и `time_start`, поэтому смена модели или
+    сброс окна истории делают старый ключ недоступным, и он истекает по TTL.
+    Список дополняется только если он уже прогрет из основной базы, иначе кеш
+    мог бы вернуть неполную историю. Первый элемент списка — метка прогрева, поэтому
+    пустая история тоже кешируется и ход, поставленный в очередь записи, попадает в кеш
+    сразу, не дожидаясь сохранения в Postgres.
+
+    Ходы в очереди записи `HistoryWriter` хранятся в хеше `gpt_context_pending:{user_ai_model.id}`
+    до сохранения в Postgres: прогрев в любом процессе добавляет их к истории из базы,
+    иначе ход, записанный позже чтения, не попал бы в кеш до истечения TTL.
+    """
+    HEAD = 'head'
+    PENDING_PREFIX = "gpt_context_pending"
+
+    def __init__(self, user_ai_model: UserAIModel):
+        self.redis_client = AsyncRedisClient.get_client()
+        self.key = f"gpt_context:{user_ai_model.id}:{user_ai_model.model_id}:{user_ai_model.time_start.timestamp()}"
+        self.pending_key = self.make_pending_key(user_ai_model.id)
+        self.time_start = user_ai_model.time_start
+
+    @classmethod
+    def make_pending_key(cls, user_ai_model_id: uuid.UUID | str) -> str:
+        return f"{cls.PENDING_PREFIX}:{user_ai_model_id}"
+
+    @staticmethod
+    def _dumps(item: dict) -> str:
+        return json.dumps({
+            'question': item['question'],
+            'question_tokens': item.get('question_tokens') or 0,
+            'answer': item['answer'],
+            'answer_tokens': item.get('answer_tokens') or 0,
+            'created_at': item['created_at'].isoformat(),
+        })
+
+    @staticmethod
+    def _loads(value: str) -> dict:
+        item = json.loads(value)
+        item['created_at'] = datetime.fromisoformat(item['created_at'])
+        return item
+
+    @staticmethod
+    def fit_budget(history: List[dict], token_budget: int) -> List[dict]:
+        """Возвращает самые новые ходы, укладывающиеся в бюджет токенов, в хронологическом порядке."""
+        token_counter = 0
+        start = len(history)
+        for item in reversed(history):
+            token_counter += (item['question_tokens'] or 0) + (item['answer_tokens'] or 0) + HISTORY_ITEM_TOKENS
+            if token_counter >= token_budget:
+                break
+            start -= 1
+        return history[start:]
+
+    async def get(self) -> List[dict] | None:
+        """Возвращает историю из кеша или None, если кеш не прогрет."""
+        values = await self.redis_client.lrange(self.key, 0, -1)
+        if not values:
+            return None
+        return [self._loads(value) for value in values if value != self.HEAD]
+
+    @staticmethod
+    def merge_pending(history: List[dict], pending: List[dict]) -> List[dict]:
+        """Добавляет к истории из базы ходы, которых в ней ещё нет, в хронологическом порядке."""
+        saved = {item['created_at'] for item in history}
+        return sorted(history + [item for item in pending if item['created_at'] not in saved], key=lambda item: item['created_at'])
+
+    async def add_pending(self, item: dict) -> None:
+        """Запоминает ход, поставленный в очередь записи, до его сохранения в Postgres."""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.hset(self.pending_key, str(item['id']), self._dumps(item))
+            await pipe.expire(self.pending_key, settings.GPT_CONTEXT_CACHE_TTL)
+            await pipe.execute()
+
+    @classmethod
+    async def release_pending(cls, rows: List[dict]) -> None:
+        """Забывает ходы, запись которых в Postgres завершена."""
+        rows = [row for row in rows if row.get('user_ai_model_id')]
+        if not rows:
+            return
+        redis_client = AsyncRedisClient.get_client()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for row in rows:
+                await pipe.hdel(cls.make_pending_key(row['user_ai_model_id']), str(row['id']))
+            await pipe.execute()
+
+    async def fill(self, history: List[dict]) -> None:
+        """
+        Прогревает кеш историей из основной базы и ходами, ещё не сохранёнными в неё.
+        Список собирается под временным ключом и переименовывается, только если кеш ещё не прогрет,
+        поэтому параллельный промах не затрёт ходы, уже дописанные в кеш.
+        """
+        pending = [self._loads(value) for value in await self.redis_client.hvals(self.pending_key)]
+        pending = [item for item in pending if item['created_at'] >= self.time_start]
+        history = self.merge_pending(history, pending)
+        staging_key = f"{self.key}:fill:{uuid.uuid4().hex}"
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.rpush(staging_key, self.HEAD, *[self._dumps(item) for item in history])
+            await pipe.expire(staging_key, settings.GPT_CONTEXT_CACHE_TTL)
+            await pipe.renamenx(staging_key, self.key)
+            await pipe.delete(staging_key)
+            await pipe.execute()
+
+    async def append(self, item: dict, context_window: int) -> None:
+        """Добавляет ход в прогретый кеш и обрезает его по контекстному окну модели."""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.rpushx(self.key, self._dumps(item))
+            await pipe.lrange(self.key, 0, -1)
+            length, values = await pipe.execute()
+        if not length:
+            return
+
+        history = [self._loads(value) for value in values if value != self.HEAD]
+        keep = len(self.fit_budget(history, context_window))
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            if keep < len(history):
+                if keep:
+                    await pipe.ltrim(self.key, -keep, -1)
+                else:
+                    await pipe.delete(self.key)
+                await pipe.lpush(self.key, self.HEAD)
+            await pipe.expire(self.key, settings.GPT_CONTEXT_CACHE_TTL)
+            await pipe.execute()
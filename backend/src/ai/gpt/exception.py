@@ -52,6 +52,11 @@ class OpenAIJSONDecodeError(OpenAIRequestError):
     pass
 
 
+class RateLimitError(OpenAIRequestError):
+    """Превышено время ожидания в очереди лимита запросов к модели."""
+    pass
+
+
 class ValueChoicesError(OpenAIRequestError):
     """Ошибки в содержании ответа."""
     pass
@@ -78,6 +83,7 @@ async def handle_exceptions(err: Exception, include_traceback: bool = False) ->
         OpenAIResponseError: 'Проблема в получении ответа от искусственного интеллекта. Вероятно, он временно недоступен.',
         OpenAIConnectionError: 'Проблема с подключением... Похоже, искусственный интеллект на мгновение отключился.',
         OpenAIJSONDecodeError: user_error_text,
+        RateLimitError: 'Слишком много запросов к искусственному интеллекту. Попробуйте немного позже.',
         UnhandledError: user_error_text,
     }
 
@@ -0,0 +1,145 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import exc
+from src.ai.gpt.context_cache import ConversationCache
+from src.conf import logger, settings
+from src.crud import ai_transaction_dao
+from src.db.deps import get_async_session
+from src.schemas.ai_transaction_schema import AITransactionCreate
+from src.utils.metrics import Metrics
+
+logger = logger.getChild(__name__)
+
+
+class HistoryWriter:
+    """
+    Отложенная запись истории запросов к ИИ.
+
+    Записи копятся в очереди и сохраняются пачками многострочным INSERT каждые
+    `HISTORY_BATCH_SIZE` записей или `HISTORY_FLUSH_INTERVAL_MS` миллисекунд.
+    При остановке очередь дописывается полностью. После записи пачки её ходы
+    снимаются с учёта ожидающих записи в `ConversationCache`.
+    """
+    MAX_RETRIES = 3
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.HISTORY_QUEUE_SIZE)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Дописывает накопленные записи и останавливает фоновую задачу."""
+        if self._task is None or self._task.done():
+            return
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+
+    async def put(self, obj_in: AITransactionCreate) -> dict:
+        """Ставит запись в очередь на сохранение и возвращает подготовленную строку."""
+        now = datetime.now(timezone.utc)
+        row = {**obj_in.model_dump(), 'id': uuid.uuid4(), 'created_at': now, 'updated_at': now}
+        self.start()
+        await self.queue.put(row)
+        Metrics.set('history_writer.queue_depth', self.queue.qsize())
+        return row
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if stopping:
+                batch.extend(self._drain())
+            for i in range(0, len(batch), settings.HISTORY_BATCH_SIZE):
+                await self._flush(batch[i:i + settings.HISTORY_BATCH_SIZE])
+
+    async def _collect(self) -> tuple[list[dict], bool]:
+        """
+        Собирает пачку до `HISTORY_BATCH_SIZE` записей, ожидая не дольше `HISTORY_FLUSH_INTERVAL_MS`
+        после первой записи. Возвращает пачку и признак остановки.
+        """
+        loop = asyncio.get_running_loop()
+        row = await self.queue.get()
+        if row is None:
+            return [], True
+        batch = [row]
+        deadline = loop.time() + settings.HISTORY_FLUSH_INTERVAL_MS / 1000
+        while len(batch) < settings.HISTORY_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _drain(self) -> list[dict]:
+        """Забирает из очереди все оставшиеся записи."""
+        rows = []
+        while not self.queue.empty():
+            row = self.queue.get_nowait()
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    @staticmethod
+    def is_transient(err: Exception) -> bool:
+        """Ошибка соединения с базой, после которой запись стоит повторить."""
+        if isinstance(err, exc.DBAPIError) and err.connection_invalidated:
+            return True
+        return isinstance(err, (exc.OperationalError, exc.InterfaceError, OSError, asyncio.TimeoutError))
+
+    async def _flush(self, batch: list[dict]) -> None:
+        start = time.monotonic()
+        written = await self._write(batch)
+        try:
+            await ConversationCache.release_pending(batch)
+        except Exception as err:
+            logger.error(f"Failed to release pending turns in context cache: {err}")
+        Metrics.inc('history_writer.rows_written', written)
+        Metrics.observe('history_writer.flush_latency_ms', (time.monotonic() - start) * 1000)
+        Metrics.set('history_writer.queue_depth', self.queue.qsize())
+
+    async def _write(self, batch: list[dict]) -> int:
+        """
+        Сохраняет пачку и возвращает число записанных строк.
+
+        Ошибки соединения повторяются до `MAX_RETRIES` раз. При ошибке в данных пачка делится пополам,
+        пока не останутся отдельные строки, поэтому теряются только строки, которые база не принимает.
+        """
+        for attempt in range(1, self.MAX_RETRIES + 1):
+            try:
+                async for session in get_async_session():
+                    await ai_transaction_dao.create_history_batch(rows=batch, db_session=session)
+                return len(batch)
+            except Exception as err:
+                if not self.is_transient(err):
+                    return await self._bisect(batch, err)
+                if attempt == self.MAX_RETRIES:
+                    Metrics.inc('history_writer.lost_rows', len(batch))
+                    logger.error(f"Failed to save {len(batch)} AI transactions: {err}")
+                    return 0
+                Metrics.inc('history_writer.flush_errors')
+                await asyncio.sleep(attempt)
+
+    async def _bisect(self, batch: list[dict], err: Exception) -> int:
+        Metrics.inc('history_writer.flush_errors')
+        if len(batch) == 1:
+            Metrics.inc('history_writer.lost_rows')
+            logger.error(f"Failed to save AI transaction {batch[0]['id']}: {err}")
+            return 0
+        middle = len(batch) // 2
+        return await self._write(batch[:middle]) + await self._write(batch[middle:])
+
+
+history_writer = HistoryWriter()
@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import json
+import uuid
+
+from src.ai.gpt.exception import InWorkError
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+from src.utils.metrics import Metrics
+
+# Удаляет блокировку, только если она принадлежит вызывающему.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class InFlightRequest:
+    """
+    Регистрация запроса в работе для объединения одинаковых запросов (single-flight).
+
+    Первый запрос захватывает ключ `gpt_inflight:{chat_id}:{hash}` через `SET NX PX`
+    и по завершении публикует результат. Повторные запросы ожидают этот результат.
+    Блокировка упавшего воркера истекает через `GPT_INFLIGHT_TTL_MS`.
+    """
+    PREFIX = "gpt_inflight"
+    RESULT_TTL = 60             # время хранения результата для ожидающих запросов в секундах
+    POLL_INTERVAL = 0.25        # интервал проверки результата в секундах
+
+    def __init__(self, chat_id, query_text: str):
+        digest = hashlib.sha1(query_text.encode('utf-8')).hexdigest()
+        self.key = f"{self.PREFIX}:{chat_id}:{digest}"
+        self.result_key = f"{self.key}:result"
+        self.token = uuid.uuid4().hex
+        self.redis_client = AsyncRedisClient.get_client()
+        self.release_script = self.redis_client.register_script(RELEASE_SCRIPT)
+
+    async def acquire(self) -> bool:
+        """Захватывает запрос. Возвращает False, если такой же запрос уже в работе."""
+        return bool(await self.redis_client.set(self.key, self.token, nx=True, px=settings.GPT_INFLIGHT_TTL_MS))
+
+    async def release(self) -> None:
+        await self.release_script(keys=[self.key], args=[self.token])
+
+    async def publish(self, data: dict) -> None:
+        """Сохраняет результат для ожидающих запросов."""
+        await self.redis_client.set(self.result_key, json.dumps(data), ex=self.RESULT_TTL)
+
+    async def wait_result(self) -> dict | None:
+        """
+        Ожидает результат исходного запроса.
+        Возвращает None, если исходный запрос завершился без результата.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.GPT_INFLIGHT_TTL_MS / 1000
+        while loop.time() < deadline:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                await pipe.get(self.result_key)
+                await pipe.exists(self.key)
+                result, in_work = await pipe.execute()
+            if result is not None:
+                Metrics.inc('inflight.coalesced')
+                return json.loads(result)
+            if not in_work:
+                return None
+            await asyncio.sleep(self.POLL_INTERVAL)
+        raise InWorkError('Запрос уже находится в работе.')
+
+    async def join(self) -> dict | None:
+        """
+        Регистрирует запрос в работе.
+        Если такой же запрос уже выполняется, ожидает и возвращает его результат,
+        а при его неудаче сам становится исходным запросом.
+        """
+        while not await self.acquire():
+            result = await self.wait_result()
+            if result is not None:
+                return result
+        return None
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+from src.crud import ai_model_dao
+from src.db.deps import get_async_session
+from src.models.user_model import User
+from src.schemas.common_schema import GenerationLaneEnum
+from src.utils.metrics import Metrics
+from telegram import Chat
+
+
+class GenerationLanes:
+    """
+    Полосы приоритета генерации ответов в очереди `taskiq_gpt`.
+
+    Приоритет сообщения в RabbitMQ задаётся полосой: платные модели, личные чаты, группы.
+    В каждом процессе воркера число одновременных генераций полосы ограничено семафором,
+    а генерации в очереди учитываются по идентификатору задачи в сортированных множествах Redis,
+    общих для всех процессов. Снятие с учёта идемпотентно, поэтому повторная доставка задачи
+    не уменьшает глубину дважды, а задачи, не дошедшие до воркера, забываются через `GPT_LANE_QUEUE_TTL` секунд.
+    """
+    PRIORITIES = {
+        GenerationLaneEnum.PAID: 3,
+        GenerationLaneEnum.PRIVATE: 2,
+        GenerationLaneEnum.GROUP: 1,
+    }
+    QUEUE_PREFIX = "gpt_lane_queue"
+    _semaphores: Dict[GenerationLaneEnum, asyncio.Semaphore] = {}
+
+    @staticmethod
+    def concurrency(lane: GenerationLaneEnum) -> int:
+        return {
+            GenerationLaneEnum.PAID: settings.GPT_LANE_PAID_CONCURRENCY,
+            GenerationLaneEnum.PRIVATE: settings.GPT_LANE_PRIVATE_CONCURRENCY,
+            GenerationLaneEnum.GROUP: settings.GPT_LANE_GROUP_CONCURRENCY,
+        }[lane]
+
+    @classmethod
+    async def resolve(cls, chat_type: str, user: User | None) -> GenerationLaneEnum:
+        """Определяет полосу запроса по типу чата и модели пользователя."""
+        if chat_type != Chat.PRIVATE:
+            return GenerationLaneEnum.GROUP
+        if user and user.active_model and user.active_model.model_id:
+            async for session in get_async_session():
+                model = await ai_model_dao.get(id=user.active_model.model_id, db_session=session)
+            if model and not model.is_free:
+                return GenerationLaneEnum.PAID
+        return GenerationLaneEnum.PRIVATE
+
+    @classmethod
+    def queue_key(cls, lane: GenerationLaneEnum) -> str:
+        return f"{cls.QUEUE_PREFIX}:{lane.value}"
+
+    @classmethod
+    async def enqueue(cls, lane: GenerationLaneEnum, task_id: str) -> None:
+        """Учитывает задачу генерации в очереди полосы."""
+        redis_client = AsyncRedisClient.get_client()
+        key = cls.queue_key(lane)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(key, {task_id: time.time()})
+            pipe.expire(key, settings.GPT_LANE_QUEUE_TTL)
+            await pipe.execute()
+
+    @classmethod
+    async def dequeue(cls, lane: GenerationLaneEnum, task_id: str) -> None:
+        """Снимает задачу генерации с учёта очереди полосы."""
+        redis_client = AsyncRedisClient.get_client()
+        await redis_client.zrem(cls.queue_key(lane), task_id)
+
+    @classmethod
+    @asynccontextmanager
+    async def slot(cls, lane: GenerationLaneEnum, task_id: str) -> AsyncIterator[None]:
+        """Снимает генерацию с учёта очереди и ждёт свободного места в полосе."""
+        await cls.dequeue(lane, task_id)
+
+        semaphore = cls._semaphores.get(lane)
+        if semaphore is None:
+            semaphore = cls._semaphores[lane] = asyncio.Semaphore(cls.concurrency(lane))
+        async with semaphore:
+            Metrics.inc(f'gpt_lane.{lane.value}.running')
+            try:
+                yield
+            finally:
+                Metrics.inc(f'gpt_lane.{lane.value}.running', -1)
+                Metrics.inc(f'gpt_lane.{lane.value}.completed')
+
+    @classmethod
+    async def queue_depths(cls) -> Dict[str, int]:
+        """Возвращает число генераций в очереди по полосам."""
+        redis_client = AsyncRedisClient.get_client()
+        expired = time.time() - settings.GPT_LANE_QUEUE_TTL
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for lane in GenerationLaneEnum:
+                pipe.zremrangebyscore(cls.queue_key(lane), '-inf', expired)
+                pipe.zcard(cls.queue_key(lane))
+            results = await pipe.execute()
+        return {lane.value: depth for lane, depth in zip(GenerationLaneEnum, results[1::2])}
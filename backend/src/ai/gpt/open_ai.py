@@ -1,43 +1,93 @@
 import asyncio
-import json
 import pprint
 
-import httpx
 import openai
-import tiktoken_async
-from httpx_socks import AsyncProxyTransport
 from src.ai.gpt.abc_provider import BaseAIProvider
+from src.ai.gpt.clients import OpenAIClientRegistry
 from src.ai.gpt.exception import (OpenAIConnectionError, OpenAIResponseError,
-                                  UnhandledError, ValueChoicesError)
+                                  UnhandledError, ValueChoicesError,
+                                  handle_exceptions)
+from src.ai.gpt.router import ProviderRouter
+from src.ai.gpt.streaming import BaseStreamer
+from src.ai.gpt.tokenizer import TokenCounter
 from src.conf import settings
 from src.conf.fastapi import ModeEnum
-from src.crud import ai_transaction_dao
+from src.models.ai_model import AIModels
+from src.utils.metrics import Metrics
 
 from .mock_text_generator import client_mock, text_stream_generator
 
 
 class OpenAIProvider(BaseAIProvider):
 
+    @staticmethod
+    def is_retriable(err: Exception) -> bool:
+        """Ошибки, после которых запрос можно повторить на резервной модели."""
+        if isinstance(err, openai.APIStatusError):
+            return err.status_code >= 500
+        return isinstance(err, openai.APIConnectionError)
+
+    async def create_completion(self, model: AIModels):
+        """
+        Запрос ответа у переданной модели.
+        Токены резервируются в лимитере этой модели и сверяются с расходом из ответа,
+        у отменённого или неудачного запроса расход нулевой.
+        """
+        if settings.MODE == ModeEnum.development:
+            client = client_mock
+            await asyncio.sleep(2)
+        else:
+            client = OpenAIClientRegistry.get_client(model.api_key, settings.SOCKS5, model.base_url)
+        reserved_tokens = await self.rate_limiter.acquire(model, self.estimated_tokens)
+        used_tokens = 0
+        try:
+            completion = await client.chat.completions.create(
+                model=model.title_model,
+                messages=self.all_prompt,
+                timeout=self.MAX_TYPING_TIME * 60,
+                **self.creativity_controls
+            )
+            usage = getattr(completion, 'usage', None)
+            if usage:
+                used_tokens = usage.prompt_tokens + usage.completion_tokens
+            return completion
+        finally:
+            await self.rate_limiter.reconcile(model, reserved_tokens, used_tokens)
+
+    async def open_stream(self, model: AIModels):
+        """
+        Открывает поток ответа у переданной модели.
+        Резерв токенов в лимитере этой модели сверяется с расходом после чтения потока.
+        """
+        client = OpenAIClientRegistry.get_client(model.api_key, settings.SOCKS5, model.base_url)
+        reserved_tokens = await self.rate_limiter.acquire(model, self.estimated_tokens)
+        try:
+            stream = await client.chat.completions.create(
+                model=model.title_model,
+                messages=self.all_prompt,
+                stream=True,
+                **self.creativity_controls
+            )
+        except BaseException:
+            await self.rate_limiter.reconcile(model, reserved_tokens, 0)
+            raise
+        self.stream_reservation = (model, reserved_tokens)
+        return stream
+
+    async def reconcile_stream(self) -> None:
+        """Сверяет резерв открытого потока с расходом токенов ответа."""
+        if self.stream_reservation is None:
+            return
+        (model, reserved_tokens), self.stream_reservation = self.stream_reservation, None
+        await self.rate_limiter.reconcile(model, reserved_tokens, self.query_text_tokens + self.return_text_tokens)
+
     async def httpx_request(self) -> None:
         """Делает запрос в OpenAI и выключает typing."""
         while True:
             try:
-                proxy_transport = AsyncProxyTransport.from_url(settings.SOCKS5)
-                async with httpx.AsyncClient(transport=proxy_transport) as transport:
-                    if settings.MODE == ModeEnum.development:
-                        client = client_mock
-                        await asyncio.sleep(2)
-                    else:
-                        client = openai.AsyncClient(
-                            api_key=self.model.api_key,
-                            timeout=self.MAX_TYPING_TIME * 60,
-                            http_client=transport,
-                        )
-                    completion = await client.chat.completions.create(
-                        model=self.model.title_model,
-                        messages=self.all_prompt,
-                        **self.creativity_controls
-                    )
+                self.answer_model, completion = await ProviderRouter.execute(
+                    self.model, self.fallback_model, self.create_completion, self.is_retriable
+                )
                 if hasattr(completion, 'choices'):
                     self.return_text = completion.choices[0].message.content.strip()
                     self.return_text_tokens = completion.usage.completion_tokens
@@ -56,31 +106,38 @@ class OpenAIProvider(BaseAIProvider):
                 raise UnhandledError(f'Необработанная ошибка в `GetAnswerGPT.httpx_request_to_openai()`: {error}') from error
 
     async def stream_request(self) -> None:
-        """Делает запрос в OpenAI и выключает typing."""
+        """Делает потоковый запрос в OpenAI. При ошибке получатель потока получает её текст вместо ответа."""
+        streamer = self.get_streamer()
+        try:
+            await self.stream_answer(streamer)
+        except Exception as error:
+            error_text, _, _ = await handle_exceptions(error)
+            await streamer.abort(error_text)
+            raise
+
+    async def stream_answer(self, streamer: BaseStreamer) -> None:
+        """Делает запрос в OpenAI и передаёт ответ получателю потока."""
         try:
-            proxy_transport = AsyncProxyTransport.from_url(settings.SOCKS5)
-            async with httpx.AsyncClient(transport=proxy_transport) as transport:
-                client = openai.AsyncOpenAI(
-                    api_key=self.model.api_key,
-                    http_client=transport,
+            await streamer.start()
+            if settings.MODE == ModeEnum.development:
+                stream = text_stream_generator(chunk_size=20)
+            else:
+                self.answer_model, stream = await ProviderRouter.execute(
+                    self.model, self.fallback_model, self.open_stream, self.is_retriable, hedge=False
                 )
-                if settings.MODE == ModeEnum.development:
-                    stream = text_stream_generator(chunk_size=20)
-                else:
-                    stream = await client.chat.completions.create(
-                        model=self.model.title_model,
-                        messages=self.all_prompt,
-                        stream=True,
-                        **self.creativity_controls
-                    )
-                first_chunk = True
-                async for chunk in stream:
-                    self.return_text += chunk.choices[0].delta.content or ""
-                    await self.send_chunk_to_websocket(self.return_text, is_start=first_chunk, is_end=False)
-                    if first_chunk:
-                        first_chunk = False
-                await self.send_chunk_to_websocket("", is_end=True)
-                await self.finite_tokens()
+            async for chunk in stream:
+                if not await streamer.is_listening():
+                    self.is_truncated = True
+                    await self.close_stream(stream)
+                    Metrics.inc('stream.truncated')
+                    break
+                delta = chunk.choices[0].delta.content or ""
+                self.return_text += delta
+                await streamer.push(delta, self.return_text)
+            if not self.is_truncated:
+                await streamer.finish(self.return_text)
+                self.streamed = True
+            await self.finite_tokens()
 
         except openai.APIStatusError as http_err:
             raise OpenAIResponseError(f'`WSAnswerChatGPT`, ответ сервера был получен, но код состояния указывает на ошибку: {http_err}') from http_err
@@ -88,17 +145,14 @@ class OpenAIProvider(BaseAIProvider):
             raise OpenAIConnectionError(f'`WSAnswerChatGPT`, проблемы соединения: {req_err}') from req_err
         except Exception as error:
             raise UnhandledError(f'Необработанная ошибка в `WSAnswerChatGPT.httpx_request_to_openai()`: {error}') from error
+        finally:
+            await self.reconcile_stream()
 
-    async def send_chunk_to_websocket(self, chunk: str, is_start: bool = False, is_end: bool = False):
-        """Отправка части текста через веб-сокет с указанием на статус начала и конца потока."""
-        message = {
-            'message': chunk,
-            'username': 'GPT',
-            'is_stream': True,
-            'is_start': is_start,
-            'is_end': is_end,
-        }
-        await self.ws_manager.send_message_to_chat(json.dumps(message), self.chat_id)
+    @staticmethod
+    async def close_stream(stream) -> None:
+        """Закрывает поток ответа вместе с соединением к провайдеру."""
+        close = getattr(stream, 'close', None) or stream.aclose
+        await close()
 
     async def num_tokens(self, text: str, corr_token: int = 0) -> int:
         """Считает количество токенов.
@@ -107,39 +161,33 @@ class OpenAIProvider(BaseAIProvider):
         - corr_token (`int`): количество токенов для ролей и разделителей
 
         """
-        try:
-            encoding = await tiktoken_async.encoding_for_model(self.model.title_model)
-        except KeyError:
-            encoding = await tiktoken_async.get_encoding("cl100k_base")
-        return len(encoding.encode(text)) + corr_token
+        return await TokenCounter.count(text, self.model.title_model) + corr_token
 
     async def get_prompt(self, session) -> None:
         """Prompt для запроса в OpenAI и модель user."""
         history = []
-        if self.model.title_model.startswith('o1'):
-            await self.add_to_prompt('user', f"# AI permanent identity, behavior, and style\n{self.assist_prompt}")
+        summary = None
+        system_role = 'user' if self.model.title_model.startswith('o1') else 'system'
+        if system_role == 'user':
+            await self.add_to_prompt('user', f"# AI permanent identity, behavior, and style\n{self.assist_prompt.en_prompt_text}")
         else:
-            await self.add_to_prompt('system', self.assist_prompt)
-
-        if self.active_model:
-            history = await ai_transaction_dao.get_history(
-                user_ai_model_id=self.active_model.id, time_start=self.time_start, current_time=self.current_time, db_session=session
-            )
+            await self.add_to_prompt('system', self.assist_prompt.en_prompt_text)
 
         if self.reply_to_message_text:
             reply_to_message_tokens = await self.num_tokens(self.reply_to_message_text, 4)
             self.query_text_tokens += reply_to_message_tokens
 
-        token_counter = self.query_text_tokens + self.assist_prompt_tokens
-        for item in history:
-            question_tokens = item.get('question_tokens', 0)
-            answer_tokens = item.get('answer_tokens', 0)
-            # +11 - токены для ролей и разделителей: 'system' - 7 'user' - 4
-            token_counter += question_tokens + answer_tokens + 11
+        if self.active_model:
+            summary = await self.get_summary(session)
+            token_budget = self.model.context_window - self.query_text_tokens - self.assist_prompt_tokens
+            if summary:
+                token_budget -= summary.summary_tokens
+            history = await self.get_history(session, token_budget, summary.summarized_until if summary else None)
 
-            if token_counter >= self.model.context_window:
-                break
+        if summary:
+            await self.add_to_prompt(system_role, f"Summary of the earlier conversation:\n{summary.summary}")
 
+        for item in history:
             await self.add_to_prompt('user', item['question'])
             await self.add_to_prompt('assistant', item['answer'])
 
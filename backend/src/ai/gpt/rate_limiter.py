@@ -0,0 +1,105 @@
+import asyncio
+
+from src.ai.gpt.exception import RateLimitError
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+from src.models.ai_model import AIModels
+from src.utils.metrics import Metrics
+
+# Резервирует запрос и токены в двух бакетах (RPM и TPM).
+# Бакеты могут уходить в минус: каждый следующий запрос ждёт дольше предыдущего,
+# поэтому очередь справедлива в порядке прихода для всех воркеров.
+# KEYS[1] - бакет запросов, KEYS[2] - бакет токенов.
+# ARGV[1] - RPM, ARGV[2] - TPM, ARGV[3] - резервируемые токены, ARGV[4] - максимальное ожидание в мс.
+# Возвращает время ожидания в мс или -1, если ожидание превышает максимум.
+ACQUIRE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local max_wait = tonumber(ARGV[4])
+
+local function reserve(key, limit, cost)
+    if limit <= 0 then
+        return nil, 0
+    end
+    local rate = limit / 60000
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or limit
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(limit, tokens + (now - ts) * rate) - cost
+    local wait = 0
+    if tokens < 0 then
+        wait = math.ceil(-tokens / rate)
+    end
+    return tokens, wait
+end
+
+local requests, requests_wait = reserve(KEYS[1], tonumber(ARGV[1]), 1)
+local tokens, tokens_wait = reserve(KEYS[2], tonumber(ARGV[2]), tonumber(ARGV[3]))
+local wait = math.max(requests_wait, tokens_wait)
+if wait > max_wait then
+    return -1
+end
+if requests then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(requests), 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], 60000 + wait)
+end
+if tokens then
+    redis.call('HSET', KEYS[2], 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', KEYS[2], 60000 + wait)
+end
+return wait
+"""
+
+# Возвращает в бакет токенов разницу между резервом и фактическим расходом.
+# KEYS[1] - бакет токенов. ARGV[1] - TPM, ARGV[2] - разница в токенах.
+RECONCILE_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if not tokens then
+    return 0
+end
+tokens = math.min(tonumber(ARGV[1]), tokens + tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens))
+return 1
+"""
+
+
+class RateLimiter:
+    """
+    Распределённый лимитер запросов к модели по `AIModels.rpm_limit` и `AIModels.tpm_limit`.
+
+    Перед запросом резервируется оценка токенов, после запроса резерв сверяется с фактическим расходом.
+    Запросы сверх квоты ждут своей очереди, а не получают 429 от провайдера.
+    """
+
+    def __init__(self):
+        self.redis_client = AsyncRedisClient.get_client()
+        self.acquire_script = self.redis_client.register_script(ACQUIRE_SCRIPT)
+        self.reconcile_script = self.redis_client.register_script(RECONCILE_SCRIPT)
+
+    @staticmethod
+    def _keys(model: AIModels) -> list[str]:
+        return [f"ratelimit:{model.id}:rpm", f"ratelimit:{model.id}:tpm"]
+
+    async def acquire(self, model: AIModels, tokens: int) -> int:
+        """Ожидает своей очереди и возвращает количество зарезервированных токенов."""
+        if not model.rpm_limit and not model.tpm_limit:
+            return 0
+
+        wait_ms = await self.acquire_script(
+            keys=self._keys(model),
+            args=[model.rpm_limit or 0, model.tpm_limit or 0, tokens, settings.GPT_RATE_LIMIT_MAX_WAIT_MS],
+        )
+        if wait_ms < 0:
+            Metrics.inc('rate_limiter.rejected')
+            raise RateLimitError(f'Превышено время ожидания лимита запросов модели {model.title_model}.')
+
+        Metrics.observe('rate_limiter.wait_ms', wait_ms)
+        if wait_ms:
+            await asyncio.sleep(wait_ms / 1000)
+        return tokens if model.tpm_limit else 0
+
+    async def reconcile(self, model: AIModels, reserved: int, used: int) -> None:
+        """Сверяет резерв токенов с фактическим расходом."""
+        if not reserved or reserved == used:
+            return
+        await self.reconcile_script(keys=self._keys(model)[1:], args=[model.tpm_limit, reserved - used])
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+from src.models.ai_model import AIModels
+from src.utils.metrics import Metrics
+
+
+class ResponseCache:
+    """
+    Кеш ответов модели для детерминированных запросов.
+
+    Ключ - хеш модели, промпта, нормализованного хвоста истории, запроса и параметров креативности.
+    Записи живут `GPT_RESPONSE_CACHE_TTL` секунд, а индекс в sorted set ограничивает их число
+    значением `GPT_RESPONSE_CACHE_MAX_SIZE`, вытесняя самые старые.
+    """
+    PREFIX = "gpt_response"
+    INDEX_KEY = "gpt_response:index"
+    HISTORY_TAIL = 4  # количество последних сообщений истории в ключе
+
+    def __init__(self):
+        self.redis_client = AsyncRedisClient.get_client()
+
+    @staticmethod
+    def is_cacheable(model: AIModels, creativity_controls: Dict[str, Any]) -> bool:
+        return creativity_controls.get('temperature') == 0 or bool(model.allow_response_cache)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.split()).lower()
+
+    @classmethod
+    def make_key(cls, model: AIModels, prompt_id: UUID, all_prompt: List[dict], creativity_controls: Dict[str, Any]) -> str:
+        """Возвращает ключ кеша. Последний элемент `all_prompt` - запрос пользователя."""
+        tail = [(item['role'], cls._normalize(item['content'])) for item in all_prompt[1:][-(cls.HISTORY_TAIL + 1):]]
+        payload = json.dumps(
+            [model.title_model, str(prompt_id), tail, creativity_controls],
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+        return f"{cls.PREFIX}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    async def get(self, key: str) -> dict | None:
+        value = await self.redis_client.get(key)
+        if value is None:
+            Metrics.inc('response_cache.misses')
+            return None
+        Metrics.inc('response_cache.hits')
+        return json.loads(value)
+
+    async def set(self, key: str, data: dict) -> None:
+        now = time.time()
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.set(key, json.dumps(data), ex=settings.GPT_RESPONSE_CACHE_TTL)
+            await pipe.zadd(self.INDEX_KEY, {key: now})
+            await pipe.zremrangebyscore(self.INDEX_KEY, '-inf', now - settings.GPT_RESPONSE_CACHE_TTL)
+            await pipe.zcard(self.INDEX_KEY)
+            *_, size = await pipe.execute()
+
+        overflow = size - settings.GPT_RESPONSE_CACHE_MAX_SIZE
+        if overflow > 0:
+            evicted = await self.redis_client.zpopmin(self.INDEX_KEY, overflow)
+            if evicted:
+                await self.redis_client.delete(*[evicted_key for evicted_key, _ in evicted])
+                Metrics.inc('response_cache.evictions', len(evicted))
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, TypeVar
+from uuid import UUID
+
+from src.conf import logger, settings
+from src.models.ai_model import AIModels
+from src.utils.metrics import Metrics
+
+logger = logger.getChild(__name__)
+
+T = TypeVar("T")
+
+
+class RouteStats:
+    """Статистика маршрута к модели: EWMA задержки и ошибок и окно задержек для p95."""
+    ALPHA = 0.2             # вес нового измерения в EWMA
+    WINDOW = 200            # количество последних задержек для p95
+    MIN_SAMPLES = 20        # минимум измерений для расчёта p95
+
+    def __init__(self):
+        self.latency_ewma: float | None = None
+        self.error_ewma = 0.0
+        self.latencies: deque = deque(maxlen=self.WINDOW)
+
+    def observe(self, latency_ms: float | None, is_error: bool) -> None:
+        self.error_ewma += self.ALPHA * (float(is_error) - self.error_ewma)
+        if latency_ms is None:
+            return
+        self.latencies.append(latency_ms)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency_ms
+        else:
+            self.latency_ewma += self.ALPHA * (latency_ms - self.latency_ewma)
+
+    @property
+    def p95(self) -> float | None:
+        if len(self.latencies) < self.MIN_SAMPLES:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[int(len(latencies) * 0.95) - 1]
+
+
+class ProviderRouter:
+    """
+    Маршрутизация запросов между основной и резервной моделью.
+
+    Запрос уходит на модель с меньшей долей ошибок, при ошибке соединения или 5xx
+    повторяется на резервной модели. Если ответ не пришёл за p95 задержки основной модели,
+    на резервную модель отправляется хеджирующий запрос и используется первый успешный ответ.
+    Статистика хранится в памяти процесса.
+    """
+    _stats: Dict[UUID, RouteStats] = {}
+
+    @classmethod
+    def get_stats(cls, model: AIModels) -> RouteStats:
+        stats = cls._stats.get(model.id)
+        if stats is None:
+            stats = cls._stats[model.id] = RouteStats()
+        return stats
+
+    @classmethod
+    def order(cls, model: AIModels, fallback_model: AIModels | None) -> List[AIModels]:
+        """Возвращает модели в порядке обращения."""
+        if fallback_model is None:
+            return [model]
+        primary, backup = cls.get_stats(model), cls.get_stats(fallback_model)
+        if primary.error_ewma >= settings.GPT_ROUTER_ERROR_THRESHOLD and backup.error_ewma < primary.error_ewma:
+            return [fallback_model, model]
+        return [model, fallback_model]
+
+    @classmethod
+    def hedge_delay(cls, model: AIModels) -> float:
+        """Задержка перед хеджирующим запросом в секундах."""
+        p95 = cls.get_stats(model).p95
+        if p95 is None:
+            return settings.GPT_HEDGE_DEFAULT_DELAY_MS / 1000
+        return max(p95, settings.GPT_HEDGE_MIN_DELAY_MS) / 1000
+
+    @classmethod
+    async def call(cls, model: AIModels, request: Callable[[AIModels], Awaitable[T]], measure_latency: bool = True) -> T:
+        """Выполняет запрос к модели и обновляет статистику маршрута."""
+        stats = cls.get_stats(model)
+        start = time.monotonic()
+        try:
+            result = await request(model)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.observe(None, True)
+            Metrics.inc(f'router.{model.title_model}.errors')
+            raise
+        latency_ms = (time.monotonic() - start) * 1000
+        stats.observe(latency_ms if measure_latency else None, False)
+        if measure_latency:
+            Metrics.observe(f'router.{model.title_model}.latency_ms', latency_ms)
+        Metrics.set(f'router.{model.title_model}.error_ewma', stats.error_ewma)
+        return result
+
+    @classmethod
+    async def execute(
+        cls, model: AIModels, fallback_model: AIModels | None, request: Callable[[AIModels], Awaitable[T]],
+        is_retriable: Callable[[Exception], bool], hedge: bool = True,
+    ) -> tuple[AIModels, T]:
+        """
+        Выполняет запрос с переключением на резервную модель.
+
+        ### Args:
+        - model (`AIModels`): Модель пользователя.
+        - fallback_model (`AIModels | None`): Резервная модель.
+        - request (`Callable`): Запрос к переданной модели.
+        - is_retriable (`Callable`): Проверка, можно ли повторить запрос на другой модели после ошибки.
+        - hedge (`bool`): Отправлять ли хеджирующий запрос. Для потоковых запросов только переключение.
+
+        ### Returns:
+        - tuple[`AIModels`, `T`]: Модель, давшая ответ, и результат запроса.
+        """
+        primary, *backups = cls.order(model, fallback_model)
+        if not backups:
+            return primary, await cls.call(primary, request, hedge)
+        backup = backups[0]
+
+        primary_task = asyncio.create_task(cls.call(primary, request, hedge))
+        try:
+            await asyncio.wait({primary_task}, timeout=cls.hedge_delay(primary) if hedge else None)
+            if primary_task.done():
+                return await cls.failover(primary_task, primary, backup, request, is_retriable, hedge)
+            return await cls.race(primary_task, primary, backup, request, hedge)
+        finally:
+            # при отмене вызывающего запрос к основной модели не должен остаться висеть
+            primary_task.cancel()
+
+    @classmethod
+    async def failover(
+        cls, primary_task: asyncio.Task, primary: AIModels, backup: AIModels,
+        request: Callable[[AIModels], Awaitable[T]], is_retriable: Callable[[Exception], bool], hedge: bool,
+    ) -> tuple[AIModels, T]:
+        """Возвращает ответ завершившегося запроса к основной модели или повторяет его на резервной."""
+        error = primary_task.exception()
+        if error is None:
+            return primary, primary_task.result()
+        if not is_retriable(error):
+            raise error
+        logger.warning(f"Failover {primary.title_model} -> {backup.title_model}: {error}")
+        Metrics.inc('router.failovers')
+        return backup, await cls.call(backup, request, hedge)
+
+    @classmethod
+    async def race(
+        cls, primary_task: asyncio.Task, primary: AIModels, backup: AIModels,
+        request: Callable[[AIModels], Awaitable[T]], hedge: bool,
+    ) -> tuple[AIModels, T]:
+        """Отправляет хеджирующий запрос к резервной модели и возвращает первый успешный ответ."""
+        Metrics.inc('router.hedged')
+        backup_task = asyncio.create_task(cls.call(backup, request, hedge))
+        tasks = {primary_task: primary, backup_task: backup}
+        pending = set(tasks)
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup_task:
+                            Metrics.inc('router.hedge_wins')
+                        return tasks[task], task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
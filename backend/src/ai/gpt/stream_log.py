@@ -0,0 +1,77 @@
+import json
+from uuid import UUID
+
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+
+
+class StreamLog:
+    """
+    Журнал кадров потокового ответа в Redis Stream для возобновления после переподключения.
+
+    Каждая генерация пишется в отдельный поток `ws_stream:{chat_id}:{generation_id}`
+    с идентификаторами записей `0-{seq + 1}`. В журнал пишутся только новые части ответа:
+    в режиме полного текста кадр записи содержит часть, накопленную с прошлой записи,
+    а при воспроизведении текст собирается заново в один кадр. Длина потока ограничена `WS_STREAM_LOG_MAXLEN`,
+    поток и ссылка на последнюю генерацию чата живут `WS_STREAM_LOG_TTL` секунд после последнего кадра.
+    """
+    PREFIX = "ws_stream"
+    CURRENT_PREFIX = "ws_stream_current"
+
+    def __init__(self, chat_id: UUID | str, generation_id: UUID | str):
+        self.chat_id = chat_id
+        self.generation_id = generation_id
+
+    @classmethod
+    def key(cls, chat_id: UUID | str, generation_id: UUID | str) -> str:
+        return f"{cls.PREFIX}:{chat_id}:{generation_id}"
+
+    async def append(self, frames: list[dict]) -> None:
+        """Записывает кадры по возрастанию `seq` одним запросом."""
+        redis_client = AsyncRedisClient.get_client()
+        key = self.key(self.chat_id, self.generation_id)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for frame in frames:
+                pipe.xadd(key, {'frame': json.dumps(frame)}, id=f"0-{frame['seq'] + 1}", maxlen=settings.WS_STREAM_LOG_MAXLEN)
+                if frame['is_start']:
+                    pipe.set(f"{self.CURRENT_PREFIX}:{self.chat_id}", str(self.generation_id), ex=settings.WS_STREAM_LOG_TTL)
+            pipe.expire(key, settings.WS_STREAM_LOG_TTL)
+            await pipe.execute()
+
+    @staticmethod
+    def merge(frames: list[dict]) -> list[dict]:
+        """
+        Объединяет части ответа в режиме полного текста в один кадр с последним `seq`.
+        Клиенту достаточно последнего состояния, поэтому остаются кадр с объединённым текстом и завершающий кадр.
+        """
+        parts = [frame for frame in frames if not frame['is_end']]
+        merged = [{
+            **parts[-1], 'is_start': parts[0]['is_start'], 'message': ''.join(frame['message'] for frame in parts),
+        }] if parts else []
+        return merged + [frame for frame in frames if frame['is_end']]
+
+    @classmethod
+    async def replay(cls, chat_id: UUID | str, generation_id: UUID | str | None, last_seq: int) -> list[dict]:
+        """
+        Возвращает кадры генерации после `last_seq`.
+
+        ### Args:
+        - chat_id (`UUID | str`): Чат.
+        - generation_id (`UUID | str | None`): Генерация из последнего полученного кадра.
+            Если не передана, берётся последняя генерация чата.
+        - last_seq (`int`): Номер последнего полученного кадра, -1 — воспроизвести генерацию целиком.
+
+        ### Returns:
+        - list[`dict`]: Кадры по возрастанию `seq`.
+        """
+        redis_client = AsyncRedisClient.get_client()
+        if generation_id is None:
+            generation_id = await redis_client.get(f"{cls.CURRENT_PREFIX}:{chat_id}")
+            if generation_id is None:
+                return []
+        entries = await redis_client.xrange(cls.key(chat_id, generation_id))
+        frames = [json.loads(fields['frame']) for _, fields in entries]
+        if frames and not frames[0].get('is_delta'):
+            frames = cls.merge(frames)
+        # начало генерации клиент уже получил, если передал номер кадра
+        return [{**frame, 'is_start': frame['is_start'] and last_seq < 0} for frame in frames if frame['seq'] > last_seq]
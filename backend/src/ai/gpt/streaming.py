@@ -0,0 +1,235 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from uuid import UUID, uuid4
+
+from src.ai.gpt.stream_log import StreamLog
+from src.conf import logger, settings
+from src.websocket import ConnectionManager
+from telegram import Bot
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+logger = logger.getChild(__name__)
+
+
+class BaseStreamer(ABC):
+    """Получатель потокового ответа модели."""
+
+    async def start(self) -> None:
+        """Вызывается перед запросом к модели."""
+        pass
+
+    async def is_listening(self) -> bool:
+        """Есть ли ещё получатель ответа. Без получателя генерация прерывается."""
+        return True
+
+    @abstractmethod
+    async def push(self, delta: str, full_text: str) -> None:
+        """Принимает очередную часть ответа и накопленный текст."""
+        pass
+
+    @abstractmethod
+    async def finish(self, full_text: str) -> None:
+        """Завершает поток, передавая полный текст ответа."""
+        pass
+
+    async def abort(self, error_text: str) -> None:
+        """Завершает поток после ошибки генерации, передавая текст ошибки для пользователя."""
+        pass
+
+
+class WebSocketStreamer(BaseStreamer):
+    """
+    Отправляет в веб-сокет весь накопленный текст на каждую часть ответа.
+
+    Кадры несут `generation_id` и порядковый номер `seq` и пишутся в `StreamLog`,
+    чтобы переподключившийся клиент получил пропущенные кадры. Запись в журнал идёт в фоне
+    вне отправки кадров: пока идёт запись, новые кадры копятся и пишутся следующим запросом.
+    """
+    _log_tasks: set[asyncio.Task] = set()
+
+    def __init__(self, ws_manager: ConnectionManager, chat_id: UUID):
+        self.ws_manager = ws_manager
+        self.chat_id = chat_id
+        self.generation_id = uuid4()
+        self.log = StreamLog(chat_id, self.generation_id) if settings.WS_STREAM_LOG_ENABLED else None
+        self.log_pending: list[dict] = []
+        self.log_task: asyncio.Task | None = None
+        self.seq = 0
+
+    async def send_frame(self, message: str, is_end: bool = False, delta: str | None = None, **extra) -> None:
+        """Отправляет кадр. `delta` — часть ответа для журнала, если кадр несёт накопленный текст."""
+        frame = {
+            'message': message,
+            'username': 'GPT',
+            'is_stream': True,
+            'is_start': self.seq == 0,
+            'is_end': is_end,
+            'generation_id': str(self.generation_id),
+            'seq': self.seq,
+            **extra,
+        }
+        droppable = self.seq > 0 and not is_end
+        if self.log:
+            self.log_frame(frame if delta is None else {**frame, 'message': delta})
+        await self.ws_manager.send_message_to_chat(frame, self.chat_id, droppable=droppable)
+        self.seq += 1
+
+    def log_frame(self, frame: dict) -> None:
+        self.log_pending.append(frame)
+        if self.log_task is None or self.log_task.done():
+            self.log_task = asyncio.create_task(self.write_log())
+            self._log_tasks.add(self.log_task)
+            self.log_task.add_done_callback(self._log_tasks.discard)
+
+    def merge_log_frames(self, frames: list[dict]) -> list[dict]:
+        """Части полного текста, накопленные за время записи, пишутся одним кадром."""
+        return StreamLog.merge(frames)
+
+    async def write_log(self) -> None:
+        while self.log_pending:
+            frames, self.log_pending = self.log_pending, []
+            try:
+                await self.log.append(self.merge_log_frames(frames))
+            except Exception as err:
+                logger.error(f"Failed to log stream of chat {self.chat_id}: {err}")
+
+    async def is_listening(self) -> bool:
+        return await self.ws_manager.has_listeners(self.chat_id)
+
+    async def push(self, delta: str, full_text: str) -> None:
+        await self.send_frame(full_text, delta=delta)
+
+    async def finish(self, full_text: str) -> None:
+        await self.send_frame("", is_end=True)
+
+
+class DeltaWebSocketStreamer(WebSocketStreamer):
+    """
+    Отправляет в веб-сокет только новые части ответа.
+
+    Части копятся в буфере и отправляются не чаще `WS_STREAM_FLUSH_INTERVAL_MS`
+    или при достижении `WS_STREAM_FLUSH_BYTES`. Финальный кадр содержит полный текст ответа.
+    """
+
+    def __init__(self, ws_manager: ConnectionManager, chat_id: UUID):
+        super().__init__(ws_manager, chat_id)
+        self.buffer: list[str] = []
+        self.buffer_size = 0
+        self.last_flush = 0.0
+
+    def merge_log_frames(self, frames: list[dict]) -> list[dict]:
+        return frames
+
+    async def flush(self) -> None:
+        if not self.buffer:
+            return
+        delta = "".join(self.buffer)
+        self.buffer.clear()
+        self.buffer_size = 0
+        self.last_flush = time.monotonic()
+        await self.send_frame(delta, is_delta=True)
+
+    async def push(self, delta: str, full_text: str) -> None:
+        if not delta:
+            return
+        self.buffer.append(delta)
+        self.buffer_size += len(delta.encode('utf-8'))
+        elapsed_ms = (time.monotonic() - self.last_flush) * 1000
+        if elapsed_ms >= settings.WS_STREAM_FLUSH_INTERVAL_MS or self.buffer_size >= settings.WS_STREAM_FLUSH_BYTES:
+            await self.flush()
+
+    async def finish(self, full_text: str) -> None:
+        self.buffer.clear()
+        self.buffer_size = 0
+        await self.send_frame(full_text, is_end=True, is_delta=True)
+
+
+class TelegramStreamer(BaseStreamer):
+    """
+    Отправляет ответ в чат Телеграм правками сообщения.
+
+    Перед запросом отправляется сообщение-заглушка, которое редактируется накопленным текстом
+    не чаще `TG_STREAM_EDIT_INTERVAL_MS`. Текст длиннее `MAX_MESSAGE_LENGTH` продолжается
+    в новом сообщении. Финальная правка отправляет текст с разметкой Markdown.
+    """
+    MAX_MESSAGE_LENGTH = 4096
+    PLACEHOLDER = '...'
+
+    def __init__(self, bot: Bot, chat_id: int):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.segments: list[list] = []  # [message_id, начало, конец] частей ответа по сообщениям
+        self.sent_text = ''             # текст последней правки текущего сообщения
+        self.next_edit = 0.0
+
+    async def send_placeholder(self, start: int) -> None:
+        message = await self.bot.send_message(self.chat_id, self.PLACEHOLDER)
+        self.segments.append([message.message_id, start, None])
+        self.sent_text = ''
+
+    async def edit(self, message_id: int, text: str, parse_mode: ParseMode | None = None, wait: bool = False) -> None:
+        """Редактирует сообщение. При флуд-контроле откладывает следующие правки или ждёт, если `wait`."""
+        while True:
+            try:
+                await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=message_id, parse_mode=parse_mode)
+                return
+            except RetryAfter as err:
+                retry_after = err.retry_after
+                delay = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else retry_after
+                self.next_edit = time.monotonic() + delay
+                if not wait:
+                    return
+                await asyncio.sleep(delay)
+            except BadRequest as err:
+                if 'not modified' in str(err):
+                    return
+                if parse_mode is None:
+                    raise
+                parse_mode = None
+
+    @staticmethod
+    def split_point(text: str, start: int, limit: int) -> int:
+        """Возвращает конец части сообщения по последнему переносу строки или пробелу."""
+        end = start + limit
+        for separator in ('\n', ' '):
+            point = text.rfind(separator, start + 1, end)
+            if point != -1:
+                return point
+        return end
+
+    async def start(self) -> None:
+        await self.send_placeholder(0)
+
+    async def push(self, delta: str, full_text: str) -> None:
+        if not delta:
+            return
+        while len(full_text) - self.segments[-1][1] > self.MAX_MESSAGE_LENGTH:
+            segment = self.segments[-1]
+            segment[2] = self.split_point(full_text, segment[1], self.MAX_MESSAGE_LENGTH)
+            await self.edit(segment[0], full_text[segment[1]:segment[2]], wait=True)
+            await self.send_placeholder(segment[2])
+
+        text = full_text[self.segments[-1][1]:].strip()
+        if text and text != self.sent_text and time.monotonic() >= self.next_edit:
+            self.next_edit = time.monotonic() + settings.TG_STREAM_EDIT_INTERVAL_MS / 1000
+            self.sent_text = text
+            await self.edit(self.segments[-1][0], text)
+
+    async def finish(self, full_text: str) -> None:
+        for message_id, start, end in self.segments:
+            text = full_text[start:end].strip()
+            if text:
+                await self.edit(message_id, text, parse_mode=ParseMode.MARKDOWN, wait=True)
+            else:
+                await self.bot.delete_message(self.chat_id, message_id)
+
+    async def abort(self, error_text: str) -> None:
+        """Заменяет заглушку текстом ошибки, а если часть ответа уже показана, отправляет его отдельным сообщением."""
+        with suppress(TelegramError):
+            if self.segments and not self.sent_text:
+                await self.edit(self.segments[-1][0], error_text, wait=True)
+            else:
+                await self.bot.send_message(self.chat_id, error_text)
@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.ai.gpt.clients import OpenAIClientRegistry
+from src.ai.gpt.context_cache import HISTORY_ITEM_TOKENS
+from src.ai.gpt.mock_text_generator import client_mock
+from src.conf import logger, settings
+from src.conf.fastapi import ModeEnum
+from src.conf.redis import AsyncRedisClient
+from src.crud import ai_summary_dao, ai_transaction_dao, user_ai_model_dao
+from src.models import AISummary, UserAIModel
+from src.schemas.ai_summary_schema import AISummaryCreate
+from src.schemas.ai_transaction_schema import AITransactionCreate
+from src.schemas.common_schema import ConsumerEnum
+
+logger = logger.getChild(__name__)
+
+SUMMARY_PROMPT = (
+    "You compress a conversation between a user and an AI assistant into a summary that will replace it "
+    "in the assistant's context. Keep facts about the user, their goals, preferences, decisions, open questions "
+    "and any code, names or numbers that later answers may depend on. Drop greetings and repetitions. "
+    "Write in the language of the conversation, in plain text, as compactly as possible."
+)
+
+
+class ConversationSummarizer:
+    """
+    Сжатие старых ходов диалога в сводку.
+
+    Ходы окна истории, не вошедшие в предыдущую сводку, кроме последних `GPT_SUMMARY_KEEP_TURNS`,
+    отправляются модели пользователя вместе с предыдущей сводкой. Новая сводка заменяет старую,
+    а `summarized_until` отмечает последний сжатый ход. Ходы, не помещающиеся в контекстное окно
+    за один запрос, сжимаются частями, каждая вместе со сводкой предыдущих.
+    """
+    LOCK_PREFIX = "gpt_summary_lock"
+    LOCK_TTL = 10 * 60
+
+    @classmethod
+    async def lock(cls, user_ai_model_id: UUID) -> bool:
+        """Захватывает сжатие диалога, чтобы не ставить задачу повторно."""
+        redis_client = AsyncRedisClient.get_client()
+        return bool(await redis_client.set(f"{cls.LOCK_PREFIX}:{user_ai_model_id}", 1, nx=True, ex=cls.LOCK_TTL))
+
+    @classmethod
+    async def unlock(cls, user_ai_model_id: UUID) -> None:
+        redis_client = AsyncRedisClient.get_client()
+        await redis_client.delete(f"{cls.LOCK_PREFIX}:{user_ai_model_id}")
+
+    @staticmethod
+    def format_turns(turns: list[dict]) -> str:
+        return "\n\n".join(f"User: {item['question']}\nAssistant: {item['answer']}" for item in turns)
+
+    @staticmethod
+    def take_turns(history: list[dict], token_budget: int) -> list[dict]:
+        """Возвращает первые ходы, укладывающиеся в бюджет токенов, но не меньше одного."""
+        token_counter = 0
+        for count, item in enumerate(history):
+            token_counter += (item['question_tokens'] or 0) + (item['answer_tokens'] or 0) + HISTORY_ITEM_TOKENS
+            if token_counter >= token_budget and count:
+                return history[:count]
+        return history
+
+    async def summarize(self, user_ai_model_id: UUID, db_session: AsyncSession) -> None:
+        user_ai_model = await user_ai_model_dao.get(id=user_ai_model_id, db_session=db_session)
+        if user_ai_model is None or user_ai_model.model_id is None:
+            return
+        await db_session.refresh(user_ai_model, ["model"])
+
+        summary = await ai_summary_dao.get_actual(user_ai_model, db_session=db_session)
+        since = summary.summarized_until if summary else user_ai_model.time_start
+        history = await ai_transaction_dao.get_history(
+            user_ai_model_id=user_ai_model.id, time_start=since, current_time=datetime.now(timezone.utc),
+            db_session=db_session,
+        )
+        history = [item for item in history if item['created_at'] > since]
+
+        pending = history[:-settings.GPT_SUMMARY_KEEP_TURNS or None]
+        while pending:
+            token_budget = user_ai_model.model.context_window - settings.GPT_SUMMARY_MAX_TOKENS - (summary.summary_tokens if summary else 0)
+            turns = self.take_turns(pending, token_budget)
+            summary = await self.compress(user_ai_model, summary, turns, db_session)
+            pending = pending[len(turns):]
+            logger.info(f"Summarized {len(turns)} turns of conversation {user_ai_model.id}")
+
+    async def compress(
+        self, user_ai_model: UserAIModel, summary: AISummary | AISummaryCreate | None, turns: list[dict], db_session: AsyncSession,
+    ) -> AISummaryCreate:
+        """Сжимает ходы вместе с предыдущей сводкой и сохраняет новую сводку."""
+        model = user_ai_model.model
+        content = self.format_turns(turns)
+        if summary:
+            content = f"Summary of the earlier conversation:\n{summary.summary}\n\nConversation:\n{content}"
+
+        if settings.MODE == ModeEnum.development:
+            client = client_mock
+        else:
+            client = OpenAIClientRegistry.get_client(model.api_key, settings.SOCKS5, model.base_url)
+        completion = await client.chat.completions.create(
+            model=model.title_model,
+            messages=[{'role': 'system', 'content': SUMMARY_PROMPT}, {'role': 'user', 'content': content}],
+            max_tokens=settings.GPT_SUMMARY_MAX_TOKENS,
+            temperature=0.2,
+        )
+        summary_text = completion.choices[0].message.content.strip()
+
+        new_summary = AISummaryCreate(
+            summary=summary_text,
+            summary_tokens=completion.usage.completion_tokens,
+            time_start=user_ai_model.time_start,
+            summarized_until=turns[-1]['created_at'],
+            user_ai_model_id=user_ai_model.id,
+        )
+        await ai_summary_dao.upsert(obj_in=new_summary, db_session=db_session)
+
+        await ai_transaction_dao.create_history(obj_in=AITransactionCreate(
+            user_id=user_ai_model.user_id,
+            question=content,
+            question_tokens=completion.usage.prompt_tokens,
+            question_token_price=model.outgoing_price,
+            answer=summary_text,
+            answer_tokens=completion.usage.completion_tokens,
+            answer_token_price=model.incoming_price,
+            consumer=ConsumerEnum.SYSTEM,
+        ), db_session=db_session)
+        return new_summary
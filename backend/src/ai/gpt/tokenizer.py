@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Tuple
+
+import tiktoken_async
+from src.conf import settings
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+class TokenCounter:
+    """
+    Подсчёт токенов с кешированием на процесс.
+
+    - кодировки резолвятся один раз на модель;
+    - количество токенов хранится в ограниченном LRU по хешу текста;
+    - большие тексты токенизируются в пуле потоков, чтобы не блокировать event loop.
+    """
+    _encodings: Dict[str, Any] = {}
+    _encodings_by_name: Dict[str, Any] = {}
+    _counts: OrderedDict[Tuple[str, bytes], int] = OrderedDict()
+    _executor = ThreadPoolExecutor(max_workers=settings.TOKENIZER_THREADS, thread_name_prefix="tokenizer")
+
+    @classmethod
+    async def get_encoding(cls, model: str) -> Any:
+        """Возвращает кодировку tiktoken для модели, по умолчанию `cl100k_base`."""
+        encoding = cls._encodings.get(model)
+        if encoding is None:
+            try:
+                encoding = await tiktoken_async.encoding_for_model(model)
+            except KeyError:
+                encoding = await tiktoken_async.get_encoding(DEFAULT_ENCODING)
+            cls._encodings[model] = encoding
+        return encoding
+
+    @classmethod
+    async def get_encoding_by_name(cls, name: str) -> Any:
+        """Возвращает кодировку tiktoken по её имени."""
+        encoding = cls._encodings_by_name.get(name)
+        if encoding is None:
+            encoding = await tiktoken_async.get_encoding(name)
+            cls._encodings_by_name[name] = encoding
+        return encoding
+
+    @classmethod
+    async def count(cls, text: str, model: str) -> int:
+        """Возвращает количество токенов в тексте для модели."""
+        encoding = await cls.get_encoding(model)
+        return await cls._count(text, encoding)
+
+    @classmethod
+    async def count_by_encodings(cls, text: str, encodings: Iterable[str]) -> Dict[str, int]:
+        """Возвращает количество токенов в тексте для каждой из кодировок."""
+        counts = {}
+        for name in set(encodings) | {DEFAULT_ENCODING}:
+            encoding = await cls.get_encoding_by_name(name)
+            counts[name] = await cls._count(text, encoding)
+        return counts
+
+    @classmethod
+    async def _count(cls, text: str, encoding: Any) -> int:
+        key = (encoding.name, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+
+        tokens = cls._counts.get(key)
+        if tokens is not None:
+            cls._counts.move_to_end(key)
+            return tokens
+
+        if len(text) > settings.TOKENIZER_THREAD_THRESHOLD:
+            loop = asyncio.get_running_loop()
+            tokens = len(await loop.run_in_executor(cls._executor, encoding.encode, text))
+        else:
+            tokens = len(encoding.encode(text))
+
+        cls._counts[key] = tokens
+        if len(cls._counts) > settings.TOKEN_COUNT_CACHE_SIZE:
+            cls._counts.popitem(last=False)
+        return tokens
@@ -6,13 +6,14 @@ from .logging import logger
 from .redis import AsyncRedisClient
 from .s3_client import S3StorageManager
 from .s3_storages import database_storage, media_storage, static_storage
-from .taskiq import result_backend, scheduler, taskiq_broker
+from .taskiq import gpt_broker, result_backend, scheduler, taskiq_broker
 
 celery_app = CeleryAppFactory.get_celery_app()
 
 __all__ = (
     'settings',
     'taskiq_broker',
+    'gpt_broker',
     'scheduler',
     'result_backend',
     'celery_app',
@@ -1,3 +1,4 @@
 #!/bin/sh
 TASKIQ_PROCESS=1 taskiq worker src.conf.taskiq:taskiq_broker --workers=4 --log-level=INFO  --fs-discover &
-TASKIQ_PROCESS=1 taskiq scheduler src.conf.taskiq:scheduler --log-level=INFO
+TASKIQ_PROCESS=1 taskiq worker src.conf.taskiq:gpt_broker src.tasks.gpt_tasks --workers=2 --log-level=INFO &
+TASKIQ_PROCESS=1 taskiq scheduler src.conf.taskiq:scheduler --fs-discover --log-level=INFO
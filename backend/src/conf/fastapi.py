@@ -57,6 +57,51 @@ class Settings(BaseSettings):
     SECRET_BOT_URL: str = os.getenv("SECRET_BOT_URL")
     DOMAIN: str = os.getenv("DOMAIN")
     SOCKS5: str = os.getenv("SOCKS5")
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20))
+    OPENAI_KEEPALIVE_EXPIRY: float = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 60))
+    OPENAI_HTTP2: bool = os.getenv("OPENAI_HTTP2", "True") == "True"
+    TOKEN_COUNT_CACHE_SIZE: int = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", 10000))
+    TOKENIZER_THREAD_THRESHOLD: int = int(os.getenv("TOKENIZER_THREAD_THRESHOLD", 8192))
+    TOKENIZER_THREADS: int = int(os.getenv("TOKENIZER_THREADS", 2))
+    GPT_CONTEXT_CACHE_TTL: int = int(os.getenv("GPT_CONTEXT_CACHE_TTL", 60 * 60))
+    WS_STREAM_FLUSH_INTERVAL_MS: int = int(os.getenv("WS_STREAM_FLUSH_INTERVAL_MS", 40))
+    WS_STREAM_FLUSH_BYTES: int = int(os.getenv("WS_STREAM_FLUSH_BYTES", 2048))
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", 64))
+    WS_SLOW_CONSUMER_POLICY: str = os.getenv("WS_SLOW_CONSUMER_POLICY", "coalesce")
+    WS_BROADCAST_BACKEND: str = os.getenv("WS_BROADCAST_BACKEND", "memory")
+    WS_STREAM_LOG_ENABLED: bool = os.getenv("WS_STREAM_LOG_ENABLED", "False") == "True"
+    WS_STREAM_LOG_MAXLEN: int = int(os.getenv("WS_STREAM_LOG_MAXLEN", 2000))
+    WS_STREAM_LOG_TTL: int = int(os.getenv("WS_STREAM_LOG_TTL", 5 * 60))
+    DB_REPLICA_HOSTS: str = os.getenv("DB_REPLICA_HOSTS", "")
+    DB_REPLICA_MAX_LAG: float = float(os.getenv("DB_REPLICA_MAX_LAG", 5))
+    DB_REPLICA_EJECT_SECONDS: int = int(os.getenv("DB_REPLICA_EJECT_SECONDS", 30))
+    DB_REPLICA_CHECK_INTERVAL: int = int(os.getenv("DB_REPLICA_CHECK_INTERVAL", 10))
+    DB_COUNT_STRATEGY: str = os.getenv("DB_COUNT_STRATEGY", "estimated")
+    DB_COUNT_EXACT_THRESHOLD: int = int(os.getenv("DB_COUNT_EXACT_THRESHOLD", 10000))
+    DB_COUNT_CACHE_TTL: int = int(os.getenv("DB_COUNT_CACHE_TTL", 60))
+    AI_TRANSACTIONS_PARTITIONS_AHEAD: int = int(os.getenv("AI_TRANSACTIONS_PARTITIONS_AHEAD", 3))
+    HISTORY_BATCH_SIZE: int = int(os.getenv("HISTORY_BATCH_SIZE", 100))
+    HISTORY_FLUSH_INTERVAL_MS: int = int(os.getenv("HISTORY_FLUSH_INTERVAL_MS", 500))
+    HISTORY_QUEUE_SIZE: int = int(os.getenv("HISTORY_QUEUE_SIZE", 10000))
+    GPT_RESPONSE_CACHE_TTL: int = int(os.getenv("GPT_RESPONSE_CACHE_TTL", 24 * 60 * 60))
+    GPT_RESPONSE_CACHE_MAX_SIZE: int = int(os.getenv("GPT_RESPONSE_CACHE_MAX_SIZE", 10000))
+    GPT_RATE_LIMIT_MAX_WAIT_MS: int = int(os.getenv("GPT_RATE_LIMIT_MAX_WAIT_MS", 60 * 1000))
+    GPT_INFLIGHT_TTL_MS: int = int(os.getenv("GPT_INFLIGHT_TTL_MS", 6 * 60 * 1000))
+    GPT_HEDGE_DEFAULT_DELAY_MS: int = int(os.getenv("GPT_HEDGE_DEFAULT_DELAY_MS", 15 * 1000))
+    GPT_HEDGE_MIN_DELAY_MS: int = int(os.getenv("GPT_HEDGE_MIN_DELAY_MS", 2 * 1000))
+    GPT_ROUTER_ERROR_THRESHOLD: float = float(os.getenv("GPT_ROUTER_ERROR_THRESHOLD", 0.5))
+    TG_STREAM_ANSWERS: bool = os.getenv("TG_STREAM_ANSWERS", "False") == "True"
+    TG_STREAM_EDIT_INTERVAL_MS: int = int(os.getenv("TG_STREAM_EDIT_INTERVAL_MS", 1000))
+    GPT_SUMMARY_ENABLED: bool = os.getenv("GPT_SUMMARY_ENABLED", "False") == "True"
+    GPT_SUMMARY_THRESHOLD: float = float(os.getenv("GPT_SUMMARY_THRESHOLD", 0.75))
+    GPT_SUMMARY_KEEP_TURNS: int = int(os.getenv("GPT_SUMMARY_KEEP_TURNS", 4))
+    GPT_SUMMARY_MAX_TOKENS: int = int(os.getenv("GPT_SUMMARY_MAX_TOKENS", 500))
+    GPT_EXECUTION_MODE: str = os.getenv("GPT_EXECUTION_MODE", "inline")
+    GPT_LANE_PAID_CONCURRENCY: int = int(os.getenv("GPT_LANE_PAID_CONCURRENCY", 16))
+    GPT_LANE_PRIVATE_CONCURRENCY: int = int(os.getenv("GPT_LANE_PRIVATE_CONCURRENCY", 8))
+    GPT_LANE_GROUP_CONCURRENCY: int = int(os.getenv("GPT_LANE_GROUP_CONCURRENCY", 4))
+    GPT_LANE_QUEUE_TTL: int = int(os.getenv("GPT_LANE_QUEUE_TTL", 15 * 60))
     HUGGINGFACE_BEARER: str = os.getenv("HUGGINGFACE_BEARER")
     LOAD_FLUX: bool = os.getenv("LOAD_FLUX", "False") == "True"
 
@@ -16,9 +16,19 @@ if os.getenv("TASKIQ_PROCESS") == "1":
 REDIS_URL = f"redis://:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings.REDIS_PORT}"
 AMQP_URL = f"amqp://{settings.RABBITMQ_DEFAULT_USER}:{settings.RABBITMQ_DEFAULT_PASS}@{settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}"
 
+GPT_QUEUE_MAX_PRIORITY = 3
+
 result_backend = RedisAsyncResultBackend(REDIS_URL)
 taskiq_broker = AioPikaBroker(AMQP_URL).with_result_backend(result_backend)
 
+# Отдельная очередь генерации ответов ИИ с приоритетами, обслуживается своими воркерами
+gpt_broker = AioPikaBroker(
+    AMQP_URL,
+    queue_name="taskiq_gpt",
+    max_priority=GPT_QUEUE_MAX_PRIORITY,
+    qos=settings.GPT_LANE_PAID_CONCURRENCY + settings.GPT_LANE_PRIVATE_CONCURRENCY + settings.GPT_LANE_GROUP_CONCURRENCY,
+)
+
 redis_source = RedisScheduleSource(
     url=REDIS_URL,
     prefix="schedule",
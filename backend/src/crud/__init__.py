@@ -1,14 +1,17 @@
 from .ai_crud import ai_model_dao, gpt_prompt_dao
+from .ai_summary_crud import ai_summary_dao
 from .ai_transaction_crud import ai_transaction_dao
 from .ai_user_models_crud import user_ai_model_dao
 from .image_crud import image_dao
 from .tg_group_crud import tg_group_dao
 from .user_crud import (UserManager, auth_backend, bearer_transport,
-                        current_active_user, fastapi_users,
-                        get_current_active_user_and_manager)
+                        current_active_user, current_superuser,
+                        fastapi_users, get_current_active_user_and_manager,
+                        user_dao)
 
 __all__ = (
     'ai_model_dao',
+    'ai_summary_dao',
     'ai_transaction_dao',
     'user_ai_model_dao',
     'gpt_prompt_dao',
@@ -16,8 +19,10 @@ __all__ = (
     'auth_backend',
     'bearer_transport',
     'current_active_user',
+    'current_superuser',
     'fastapi_users',
     'get_current_active_user_and_manager',
     'image_dao',
     'tg_group_dao',
+    'user_dao',
 )
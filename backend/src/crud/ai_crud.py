@@ -1,5 +1,6 @@
 from sqlalchemy import select
 from src.crud.base_crud import GenericCRUD, ModelType
+from src.db.routing import use_replica
 from src.models import AIModels, GPTPrompt
 from src.schemas.ai_schema import (AIModelCreate, AIModelUpdate,
                                    GPTPromptCreate, GPTPromptUpdate)
@@ -9,17 +10,25 @@ from sqlalchemy.ext.asyncio.session import AsyncSession
 class AIModelsDAO(GenericCRUD[AIModels, AIModelCreate, AIModelUpdate]):
 
     async def get_default(self, db_session: AsyncSession | None = None) -> ModelType:
+        with use_replica(db_session):
+            result = await db_session.execute(
+                select(self.model).where(self.model.is_default.is_(True))
+            )
+        return result.scalars().one_or_none()
+
+    async def get_encodings(self, db_session: AsyncSession | None = None) -> list[str]:
         result = await db_session.execute(
-            select(self.model).where(self.model.is_default.is_(True))
+            select(self.model.encoding).where(self.model.encoding.isnot(None)).distinct()
         )
-        return result.scalars().one_or_none()
+        return result.scalars().all()
 
 
 class GPTPromptDAO(GenericCRUD[GPTPrompt, GPTPromptCreate, GPTPromptUpdate]):
     async def get_default(self, db_session: AsyncSession | None = None) -> ModelType:
-        result = await db_session.execute(
-            select(self.model).where(self.model.is_default.is_(True))
-        )
+        with use_replica(db_session):
+            result = await db_session.execute(
+                select(self.model).where(self.model.is_default.is_(True))
+            )
         return result.scalars().one_or_none()
 
 
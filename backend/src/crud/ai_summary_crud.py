@@ -0,0 +1,32 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from src.crud.base_crud import GenericCRUD
+from src.models import AISummary, UserAIModel
+from src.schemas.ai_summary_schema import AISummaryCreate
+
+
+class AISummaryDAO(GenericCRUD[AISummary, AISummaryCreate, AISummaryCreate]):
+
+    async def get_actual(self, user_ai_model: UserAIModel, db_session: AsyncSession) -> AISummary | None:
+        """Возвращает сводку диалога для текущего окна истории пользователя."""
+        result = await db_session.execute(
+            select(self.model).where(
+                self.model.user_ai_model_id == user_ai_model.id,
+                self.model.time_start == user_ai_model.time_start,
+            )
+        )
+        return result.scalars().one_or_none()
+
+    async def upsert(self, *, obj_in: AISummaryCreate, db_session: AsyncSession) -> None:
+        """Сохраняет сводку диалога, заменяя предыдущую."""
+        values = obj_in.model_dump()
+        query = insert(self.model).values(**values).on_conflict_do_update(
+            index_elements=[self.model.user_ai_model_id],
+            set_={**values, 'updated_at': func.now()},
+        )
+        await db_session.execute(query)
+        await db_session.commit()
+
+
+ai_summary_dao = AISummaryDAO(AISummary)
@@ -1,5 +1,6 @@
 import uuid
-from sqlalchemy import and_, between, select
+from sqlalchemy import and_, between, func, insert, select, text
+from sqlalchemy.sql.selectable import Select
 from src.crud.base_crud import GenericCRUD
 from src.models import AITransactions
 from src.schemas.ai_transaction_schema import AITransactionCreate
@@ -8,23 +9,58 @@ from sqlalchemy.ext.asyncio.session import AsyncSession
 
 class AITransactionsDAO(GenericCRUD[AITransactions, AITransactionCreate, AITransactionCreate]):
 
-    async def get_history(self, user_ai_model_id: uuid.UUID, time_start, current_time, db_session: AsyncSession):
-        query = select(
+    def history_query(
+        self, user_ai_model_id: uuid.UUID, time_start, current_time, token_budget: int | None = None, item_tokens: int = 11,
+    ) -> Select:
+        """
+        Запрос истории диалога от новых записей к старым.
+        При заданном `token_budget` в базе отбираются самые новые записи, накопленная сумма токенов
+        которых (с учётом `item_tokens` на роли и разделители) не превышает бюджет.
+        """
+        running_tokens = func.sum(
+            func.coalesce(AITransactions.question_tokens, 0) + func.coalesce(AITransactions.answer_tokens, 0) + item_tokens
+        ).over(
+            order_by=(AITransactions.created_at.desc(), AITransactions.id.desc()),
+            rows=(None, 0),
+        )
+        window = select(
+            AITransactions.id,
             AITransactions.question,
             AITransactions.question_tokens,
             AITransactions.answer,
-            AITransactions.answer_tokens
+            AITransactions.answer_tokens,
+            AITransactions.created_at,
+            running_tokens.label('running_tokens'),
         ).where(
             and_(
                 AITransactions.user_ai_model_id == user_ai_model_id,
                 between(AITransactions.created_at, time_start, current_time),
                 AITransactions.answer.isnot(None)
             )
-        )
+        ).subquery()
+
+        query = select(
+            window.c.question,
+            window.c.question_tokens,
+            window.c.answer,
+            window.c.answer_tokens,
+            window.c.created_at,
+        ).order_by(window.c.created_at.desc(), window.c.id.desc())
+        if token_budget is not None:
+            query = query.where(window.c.running_tokens < token_budget)
+        return query
+
+    async def get_history(
+        self, user_ai_model_id: uuid.UUID, time_start, current_time, db_session: AsyncSession,
+        token_budget: int | None = None, item_tokens: int = 11,
+    ):
+        """Возвращает историю диалога в хронологическом порядке, см. `history_query`."""
+        query = self.history_query(user_ai_model_id, time_start, current_time, token_budget, item_tokens)
+        # история читается с основной базы: на реплике может не быть последнего хода,
+        # а результат прогревает кеш контекста на весь TTL
         result = await db_session.execute(query)
         history = result.mappings().all()
-        pass
-        return [dict(row) for row in history]
+        return [dict(row) for row in reversed(history)]
 
     async def create_history(self, *, obj_in: AITransactionCreate, db_session: AsyncSession) -> AITransactions:
         obj_in_data = obj_in.model_dump()
@@ -34,5 +70,23 @@ class AITransactionsDAO(GenericCRUD[AITransactions, AITransactionCreate, AITrans
         await db_session.refresh(db_obj)
         return db_obj
 
+    async def create_history_batch(self, *, rows: list[dict], db_session: AsyncSession) -> None:
+        """Сохраняет пачку записей истории одним многострочным INSERT."""
+        await db_session.execute(insert(self.model), rows)
+        await db_session.commit()
+
+    async def create_partitions(self, *, months_ahead: int, db_session: AsyncSession) -> list[str]:
+        """Создаёт месячные секции таблицы на текущий и `months_ahead` следующих месяцев, если их нет."""
+        result = await db_session.execute(
+            text(
+                "SELECT create_monthly_partition(CAST(:parent AS regclass), "
+                "CAST(date_trunc('month', now()) + make_interval(months => n) AS date)) "
+                "FROM generate_series(0, :months_ahead) AS n"
+            ),
+            {'parent': self.model.__tablename__, 'months_ahead': months_ahead},
+        )
+        await db_session.commit()
+        return list(result.scalars().all())
+
 
 ai_transaction_dao = AITransactionsDAO(AITransactions)
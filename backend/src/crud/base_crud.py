@@ -1,15 +1,23 @@
-from typing import Any, Generic, List, Type, TypeVar
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Generic, List, Sequence, Type, TypeVar
 from uuid import UUID
 
 from fastapi import HTTPException
 from fastapi_pagination import Page, Params
 from fastapi_pagination.ext.sqlalchemy import paginate
 from pydantic import BaseModel
-from sqlalchemy import exc, func, inspect, select
+from sqlalchemy import column, exc, func, inspect, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import UpdateBase
 from sqlalchemy.sql.selectable import Select
 from src.conf import logger
+from src.db.counter import RowCounter
+from src.db.routing import use_replica
 from src.models.base_model import Base
+from src.schemas.common_schema import CountStrategyEnum
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -20,33 +28,41 @@ logger = logger.getChild(__name__)
 
 
 class GenericCRUD(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    BULK_CHUNK_SIZE = 1000
+    MAX_BIND_PARAMS = 32767     # предел параметров в одном запросе asyncpg
 
     def __init__(self, model: type[ModelType]):
         self.model = model
 
     async def get(self, *, id: UUID | str, db_session: AsyncSession | None = None) -> ModelType | None:
         query = select(self.model).where(self.model.id == id)
-        result = await db_session.execute(query)
+        with use_replica(db_session):
+            result = await db_session.execute(query)
         return result.scalars().one_or_none()
 
     async def get_by_ids(self, *, list_ids: list[UUID | str], db_session: AsyncSession | None = None,) -> list[ModelType] | None:
-        result = await db_session.execute(
-            select(self.model).where(self.model.id.in_(list_ids))
-        )
+        with use_replica(db_session):
+            result = await db_session.execute(
+                select(self.model).where(self.model.id.in_(list_ids))
+            )
         return result.scalars().all()
 
-    async def get_count(self, db_session: AsyncSession | None = None) -> ModelType | None:
-        result = await db_session.execute(
-            select(func.count()).select_from(select(self.model).subquery())
-        )
-        return result.scalar()
+    async def get_count(
+        self, *, query: Select[ModelType] | None = None, strategy: CountStrategyEnum | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> int:
+        """Число записей запроса, по умолчанию всей таблицы. Стратегии подсчёта описаны в `RowCounter`."""
+        if query is None:
+            query = select(self.model)
+        return await RowCounter.count(query, db_session, strategy)
 
     async def get_multi(
         self, *, skip: int = 0, limit: int = 100, query: Select[ModelType] | None = None, db_session: AsyncSession | None = None,
     ) -> list[ModelType]:
         if query is None:
             query = select(self.model).offset(skip).limit(limit).order_by(self.model.id)
-        result = await db_session.execute(query)
+        with use_replica(db_session):
+            result = await db_session.execute(query)
         return result.scalars().all()
 
     async def get_multi_paginated(
@@ -58,6 +74,52 @@ class GenericCRUD(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         output = await paginate(db_session, query, params)
         return output
 
+    def encode_cursor(self, db_obj: ModelType) -> str:
+        """Кодирует позицию записи в порядке `(created_at, id)` в непрозрачный курсор."""
+        payload = json.dumps([db_obj.created_at.isoformat(), str(db_obj.id)])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> tuple[datetime, Any]:
+        try:
+            created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            id_type = self.model.__table__.c.id.type.python_type
+            return datetime.fromisoformat(created_at), id_type(id)
+        except (ValueError, TypeError, NotImplementedError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    async def get_multi_by_cursor(
+        self, *, cursor: str | None = None, limit: int = 50, query: Select[ModelType] | None = None,
+        db_session: AsyncSession | None = None,
+    ) -> tuple[list[ModelType], str | None]:
+        """
+        Возвращает страницу записей от новых к старым по ключу `(created_at, id)`.
+
+        В отличие от `get_multi_paginated` не выполняет `count(*)` и не пропускает строки через OFFSET,
+        поэтому время запроса не зависит от глубины страницы.
+
+        ### Args:
+        - cursor (`str | None`): Курсор из предыдущей страницы, None — первая страница.
+        - limit (`int`): Размер страницы.
+        - query (`Select | None`): Запрос с фильтрами, по умолчанию все записи модели.
+
+        ### Returns:
+        - tuple[list[`ModelType`], `str | None`]: Записи и курсор следующей страницы, None на последней.
+        """
+        if query is None:
+            query = select(self.model)
+        if cursor is not None:
+            created_at, id = self.decode_cursor(cursor)
+            query = query.where(tuple_(self.model.created_at, self.model.id) < tuple_(created_at, id))
+        query = query.order_by(self.model.created_at.desc(), self.model.id.desc()).limit(limit + 1)
+
+        with use_replica(db_session):
+            result = await db_session.execute(query)
+        db_objs = result.scalars().all()
+        if len(db_objs) <= limit:
+            return db_objs, None
+        db_objs = db_objs[:limit]
+        return db_objs, self.encode_cursor(db_objs[-1])
+
     async def create(
         self, *, obj_in: CreateSchemaType | ModelType | None = None, created_by_id: UUID | int | None = None, relationship_refresh: List = [], db_session: AsyncSession | None = None,
     ) -> ModelType:
@@ -99,6 +161,124 @@ class GenericCRUD(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         await db_session.refresh(obj_current)
         return obj_current
 
+    def _bulk_chunks(self, rows: list[dict[str, Any]], chunk_size: int | None) -> list[list[dict[str, Any]]]:
+        """
+        Делит строки на пачки для многострочного запроса.
+        Строки группируются по набору полей, размер пачки ограничен числом параметров запроса.
+        """
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+
+        chunks = []
+        for fields, group in groups.items():
+            size = min(chunk_size or self.BULK_CHUNK_SIZE, self.MAX_BIND_PARAMS // max(len(fields), 1))
+            chunks.extend(group[start:start + size] for start in range(0, len(group), size))
+        return chunks
+
+    async def _bulk_execute(
+        self, statement: Callable[[list[dict[str, Any]]], UpdateBase], rows: list[dict[str, Any]],
+        return_objects: bool, chunk_size: int | None, db_session: AsyncSession,
+    ) -> list[ModelType] | list[dict[str, Any]]:
+        """Выполняет запрос `statement` для каждой пачки строк с RETURNING и фиксирует транзакцию."""
+        returned = []
+        for chunk in self._bulk_chunks(rows, chunk_size):
+            if return_objects:
+                result = await db_session.scalars(
+                    statement(chunk).returning(self.model), execution_options={'populate_existing': True},
+                )
+                returned.extend(result.all())
+            else:
+                result = await db_session.execute(statement(chunk).returning(*self.model.__table__.columns))
+                returned.extend(dict(row) for row in result.mappings())
+        await db_session.commit()
+        return returned
+
+    async def bulk_create(
+        self, *, objs_in: Sequence[CreateSchemaType | dict[str, Any]], return_objects: bool = True,
+        chunk_size: int | None = None, db_session: AsyncSession | None = None,
+    ) -> list[ModelType] | list[dict[str, Any]]:
+        """
+        Создаёт записи многострочными INSERT ... RETURNING по `BULK_CHUNK_SIZE` строк.
+
+        ### Args:
+        - objs_in (`Sequence[CreateSchemaType | dict]`): Создаваемые записи.
+        - return_objects (`bool`): Возвращать объекты модели. Если False, возвращаются словари
+            столбцов без создания объектов ORM.
+        - chunk_size (`int | None`): Размер пачки, по умолчанию `BULK_CHUNK_SIZE`.
+
+        ### Returns:
+        - list[`ModelType`] | list[`dict`]: Созданные записи.
+        """
+        rows = [obj if isinstance(obj, dict) else obj.model_dump() for obj in objs_in]
+        return await self._bulk_execute(
+            lambda chunk: insert(self.model).values(chunk), rows, return_objects, chunk_size, db_session,
+        )
+
+    async def bulk_upsert(
+        self, *, objs_in: Sequence[CreateSchemaType | dict[str, Any]], conflict_key: Sequence[str] = ('id',),
+        update_fields: Sequence[str] | None = None, return_objects: bool = True,
+        chunk_size: int | None = None, db_session: AsyncSession | None = None,
+    ) -> list[ModelType] | list[dict[str, Any]]:
+        """
+        Создаёт записи или обновляет существующие через INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+
+        ### Args:
+        - objs_in (`Sequence[CreateSchemaType | dict]`): Записи. При повторе ключа берётся последняя.
+        - conflict_key (`Sequence[str]`): Столбцы уникального индекса, по которому ищется существующая запись.
+            Должны быть в каждой записи.
+        - update_fields (`Sequence[str] | None`): Обновляемые столбцы, по умолчанию все переданные, кроме ключа.
+        - return_objects (`bool`): Возвращать объекты модели или словари столбцов.
+        - chunk_size (`int | None`): Размер пачки, по умолчанию `BULK_CHUNK_SIZE`.
+
+        ### Returns:
+        - list[`ModelType`] | list[`dict`]: Созданные и обновлённые записи.
+        """
+        # одна пачка не может обновить строку дважды
+        rows = {
+            tuple(row[name] for name in conflict_key): row
+            for row in (obj if isinstance(obj, dict) else obj.model_dump() for obj in objs_in)
+        }
+
+        def statement(chunk: list[dict[str, Any]]) -> UpdateBase:
+            query = insert(self.model).values(chunk)
+            fields = update_fields or [name for name in chunk[0] if name not in conflict_key]
+            return query.on_conflict_do_update(
+                index_elements=list(conflict_key),
+                set_={**{name: query.excluded[name] for name in fields}, 'updated_at': func.now()},
+            )
+
+        return await self._bulk_execute(statement, list(rows.values()), return_objects, chunk_size, db_session)
+
+    async def bulk_update(
+        self, *, objs_in: Sequence[dict[str, Any]], key: str = 'id', return_objects: bool = True,
+        chunk_size: int | None = None, db_session: AsyncSession | None = None,
+    ) -> list[ModelType] | list[dict[str, Any]]:
+        """
+        Обновляет записи одним UPDATE ... FROM (VALUES ...) ... RETURNING на пачку.
+
+        ### Args:
+        - objs_in (`Sequence[dict]`): Новые значения полей вместе со значением `key`.
+        - key (`str`): Столбец, по которому находится запись.
+        - return_objects (`bool`): Возвращать объекты модели или словари столбцов.
+        - chunk_size (`int | None`): Размер пачки, по умолчанию `BULK_CHUNK_SIZE`.
+
+        ### Returns:
+        - list[`ModelType`] | list[`dict`]: Обновлённые записи. Записи без совпадения по `key` пропускаются.
+        """
+        table = self.model.__table__
+
+        def statement(chunk: list[dict[str, Any]]) -> UpdateBase:
+            fields = [name for name in chunk[0] if name != key]
+            data = values(
+                *(column(name, table.c[name].type) for name in (key, *fields)), name='data',
+            ).data([tuple(row[name] for name in (key, *fields)) for row in chunk])
+            return update(self.model).where(table.c[key] == data.c[key]).values(
+                {name: data.c[name] for name in fields}
+            ).execution_options(synchronize_session=False)
+
+        return await self._bulk_execute(statement, list(objs_in), return_objects, chunk_size, db_session)
+
     async def remove(
         self, *, id: UUID | int, db_session: AsyncSession | None = None
     ) -> ModelType:
@@ -61,6 +61,13 @@ class ImageDAO(GenericCRUD[Image, ImageCreate, ImageUpdate]):
         images_with_urls = await asyncio.gather(*tasks)
         return images_with_urls
 
+    async def get_multi_by_cursor(
+        self, *, cursor: str | None = None, limit: int = 50, db_session: AsyncSession | None = None,
+    ) -> tuple[list[ImageDAOResponse], str | None]:
+        db_objs, next_cursor = await super().get_multi_by_cursor(cursor=cursor, limit=limit, db_session=db_session)
+        images_with_urls = await asyncio.gather(*(self._get_image_url(db_obj) for db_obj in db_objs))
+        return list(images_with_urls), next_cursor
+
     async def create_with_file(
         self, *, file: UploadFile, is_main: bool, model_instance: Type[Base], path: str = "", db_session: AsyncSession | None = None
     ) -> Image | None:
@@ -13,9 +13,11 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from src.conf import logger, settings
 from src.crud import image_dao
+from src.crud.base_crud import GenericCRUD
 from src.db.deps import get_user_db
+from src.db.routing import use_replica
 from src.models import Image, TgGroup, User
-from src.schemas.user_schema import UserCreate
+from src.schemas.user_schema import UserCreate, UserUpdate
 
 logger = logger.getChild(__name__)
 
@@ -129,7 +131,8 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
             query = select(User).where(User.tg_id == tg_id)
         load_options = [selectinload(getattr(User, attr)) for attr in prefetch_related]
         query = query.options(*load_options)
-        result = await self.db_session.execute(query)
+        with use_replica(self.db_session):
+            result = await self.db_session.execute(query)
         return result.scalars().first()
 
     async def add_group(self, *, user: User, group: TgGroup,) -> User | None:
@@ -161,8 +164,11 @@ auth_backend = AuthenticationBackend(
     get_strategy=get_jwt_strategy,
 )
 
+user_dao = GenericCRUD[User, UserCreate, UserUpdate](User)
+
 fastapi_users = FastAPIUsers[User, uuid.UUID](get_user_manager, [auth_backend])
 current_active_user = fastapi_users.current_user(active=True)
+current_superuser = fastapi_users.current_user(active=True, superuser=True)
 
 
 async def get_current_active_user_and_manager(
@@ -0,0 +1,101 @@
+import hashlib
+import json
+
+from sqlalchemy import Table, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import CompileError, DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.selectable import Select
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+from src.schemas.common_schema import CountStrategyEnum
+
+
+class RowCounter:
+    """
+    Подсчёт строк запроса с выбором стратегии.
+
+    - `exact`: `count(*)` по запросу.
+    - `estimated`: оценка планировщика — `pg_class.reltuples` таблицы (с секциями) для запроса
+      без фильтров, строки плана `EXPLAIN` для запроса с фильтрами. Если оценка меньше
+      `DB_COUNT_EXACT_THRESHOLD`, выполняется точный подсчёт: на малых выборках он дёшев.
+    - `cached`: точный подсчёт, сохранённый в Redis на `DB_COUNT_CACHE_TTL` секунд.
+    """
+    CACHE_PREFIX = "db_count"
+
+    @staticmethod
+    def get_table(query: Select) -> Table | None:
+        """Возвращает таблицу, если запрос выбирает её строки без фильтров."""
+        froms = query.get_final_froms()
+        if query.whereclause is None and len(froms) == 1 and isinstance(froms[0], Table):
+            return froms[0]
+        return None
+
+    @staticmethod
+    async def exact(query: Select, db_session: AsyncSession) -> int:
+        result = await db_session.execute(select(func.count()).select_from(query.subquery()))
+        return result.scalar()
+
+    @staticmethod
+    async def table_estimate(table: Table, db_session: AsyncSession) -> int:
+        """Оценка числа строк таблицы и её секций по статистике `pg_class.reltuples`."""
+        result = await db_session.execute(
+            text(
+                "SELECT coalesce(sum(greatest(c.reltuples, 0)), 0) FROM pg_class c "
+                "WHERE c.oid = CAST(:table AS regclass) "
+                "OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass))"
+            ),
+            {'table': table.name},
+        )
+        return int(result.scalar())
+
+    @staticmethod
+    async def plan_estimate(query: Select, db_session: AsyncSession) -> int:
+        """Оценка числа строк запроса по плану `EXPLAIN` в точке сохранения."""
+        compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})
+        # ошибка EXPLAIN откатывается до точки сохранения и не прерывает транзакцию вызывающего
+        async with db_session.begin_nested():
+            result = await db_session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @classmethod
+    async def estimated(cls, query: Select, db_session: AsyncSession) -> int:
+        table = cls.get_table(query)
+        if table is not None:
+            estimate = await cls.table_estimate(table, db_session)
+        else:
+            try:
+                estimate = await cls.plan_estimate(query, db_session)
+            except (CompileError, DBAPIError):
+                # параметры, которые не выводятся литералами или отклонены базой в тексте запроса, считаются точно
+                return await cls.exact(query, db_session)
+        if estimate < settings.DB_COUNT_EXACT_THRESHOLD:
+            return await cls.exact(query, db_session)
+        return estimate
+
+    @classmethod
+    async def cached(cls, query: Select, db_session: AsyncSession) -> int:
+        compiled = query.compile(dialect=postgresql.dialect())
+        digest = hashlib.sha1(f"{compiled}{sorted(compiled.params.items())}".encode()).hexdigest()
+        key = f"{cls.CACHE_PREFIX}:{digest}"
+
+        redis_client = AsyncRedisClient.get_client()
+        count = await redis_client.get(key)
+        if count is not None:
+            return int(count)
+        count = await cls.exact(query, db_session)
+        await redis_client.set(key, count, ex=settings.DB_COUNT_CACHE_TTL)
+        return count
+
+    @classmethod
+    async def count(cls, query: Select, db_session: AsyncSession, strategy: CountStrategyEnum | None = None) -> int:
+        """Считает строки запроса стратегией `strategy`, по умолчанию `DB_COUNT_STRATEGY`."""
+        strategy = CountStrategyEnum(strategy or settings.DB_COUNT_STRATEGY)
+        if strategy == CountStrategyEnum.ESTIMATED:
+            return await cls.estimated(query, db_session)
+        if strategy == CountStrategyEnum.CACHED:
+            return await cls.cached(query, db_session)
+        return await cls.exact(query, db_session)
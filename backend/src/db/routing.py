@@ -0,0 +1,125 @@
+import asyncio
+import itertools
+import time
+from contextlib import contextmanager, suppress
+from typing import Iterator
+
+from sqlalchemy import Select, event, text
+from sqlalchemy.engine import Engine, ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from src.conf import logger, settings
+from src.utils.metrics import Metrics
+
+logger = logger.getChild(__name__)
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaPool:
+    """
+    Реплики для чтения с исключением неисправных.
+
+    Реплика исключается на `DB_REPLICA_EJECT_SECONDS` при ошибке соединения или если её отставание
+    превышает `DB_REPLICA_MAX_LAG` секунд. Проверка отставания выполняется фоновой задачей
+    каждые `DB_REPLICA_CHECK_INTERVAL` секунд; без неё реплика возвращается по истечении срока исключения.
+    """
+
+    def __init__(self, engines: list[AsyncEngine]):
+        self.engines = engines
+        self.ejected_until: dict[Engine, float] = {}
+        self._counter = itertools.count()
+        self._task: asyncio.Task | None = None
+        for engine in engines:
+            event.listen(engine.sync_engine, "handle_error", self._on_error)
+
+    def eject(self, engine: Engine, reason: str) -> None:
+        if engine not in self.ejected_until:
+            logger.warning(f"Replica {engine.url.host}:{engine.url.port} ejected: {reason}")
+            Metrics.inc('db.replica_ejections')
+        self.ejected_until[engine] = time.monotonic() + settings.DB_REPLICA_EJECT_SECONDS
+
+    def _on_error(self, context: ExceptionContext) -> None:
+        if context.is_disconnect or isinstance(context.original_exception, OSError):
+            self.eject(context.engine, str(context.original_exception))
+
+    def choose(self) -> AsyncEngine | None:
+        """Возвращает исправную реплику по кругу или None, если таких нет."""
+        now = time.monotonic()
+        healthy = [engine for engine in self.engines if self.ejected_until.get(engine.sync_engine, 0) <= now]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    async def check(self) -> None:
+        for engine in self.engines:
+            try:
+                async with engine.connect() as connection:
+                    lag = float(await connection.scalar(REPLICA_LAG_QUERY))
+            except Exception as err:
+                self.eject(engine.sync_engine, str(err))
+                continue
+            self.observe_lag(engine, lag)
+
+    def observe_lag(self, engine: AsyncEngine, lag: float) -> None:
+        """Исключает отстающую реплику или возвращает догнавшую."""
+        Metrics.set(f'db.replica.{engine.url.host}.lag_s', lag)
+        if lag > settings.DB_REPLICA_MAX_LAG:
+            self.eject(engine.sync_engine, f"lag {lag:.1f}s")
+        elif self.ejected_until.pop(engine.sync_engine, None) is not None:
+            logger.info(f"Replica {engine.url.host}:{engine.url.port} restored")
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+    async def start(self) -> None:
+        if self.engines and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+
+class RoutingSession(Session):
+    """
+    Сессия, направляющая чтения на реплики.
+
+    На реплику уходят только SELECT внутри `use_replica` и только пока сессия ничего не записала:
+    после первой записи все запросы сессии идут на основную базу (read-your-writes).
+    """
+    replicas: ReplicaPool | None = None
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+        elif self.replicas is not None and self.info.get('use_replica') and not self.info.get('wrote') and isinstance(clause, Select):
+            engine = self.replicas.choose()
+            if engine is not None:
+                return engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@contextmanager
+def use_replica(db_session: AsyncSession | None) -> Iterator[None]:
+    """Разрешает выполнять запросы чтения сессии на реплике."""
+    if db_session is None:
+        yield
+        return
+    previous = db_session.info.get('use_replica', False)
+    db_session.info['use_replica'] = True
+    try:
+        yield
+    finally:
+        db_session.info['use_replica'] = previous
@@ -1,9 +1,10 @@
-from sqlalchemy import QueuePool, create_engine
+from sqlalchemy import QueuePool, create_engine, make_url
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from src.conf import ModeEnum, settings
+from src.db.routing import ReplicaPool, RoutingSession
 
 DB_POOL_SIZE = 83
 WEB_CONCURRENCY = 9
@@ -17,11 +18,31 @@ engine = create_async_engine(
     pool_size=POOL_SIZE,
     max_overflow=64,
 )
+
+# Реплики для чтения: DB_REPLICA_HOSTS=host:port,host:port, остальные параметры как у основной базы
+replica_pool = ReplicaPool([
+    create_async_engine(
+        make_url(str(settings.ASYNC_DATABASE_URI)).set(host=host, port=int(port or settings.POSTGRES_PORT)),
+        echo=False,
+        poolclass=NullPool if settings.MODE == ModeEnum.testing else AsyncAdaptedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=64,
+        pool_pre_ping=True,
+    )
+    for host, _, port in (item.strip().partition(':') for item in settings.DB_REPLICA_HOSTS.split(',') if item.strip())
+])
+
+
+class AppRoutingSession(RoutingSession):
+    replicas = replica_pool
+
+
 async_session = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=AppRoutingSession,
     expire_on_commit=False,
 )
 
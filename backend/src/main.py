@@ -9,12 +9,16 @@ from sqladmin import Admin
 from src.admin import ImageAdmin, UserAdmin
 from src.admin.ai import AIModelsAdmin, GPTPromptAdmin
 from src.admin.auth import AdminAuth
-from src.conf import settings, taskiq_broker
+from src.ai.gpt.clients import OpenAIClientRegistry
+from src.ai.gpt.history_writer import history_writer
+from src.conf import gpt_broker, settings, taskiq_broker
 from src.conf.redis import set_async_redis_client
-from src.db.session import engine
+from src.db.session import engine, replica_pool
 from src.routers import main_router
+from src.schemas.common_schema import ExecutionModeEnum
 from src.tgbot.dispatcher import setup_handlers
 from src.tgbot.loader import application
+from src.websocket import manager
 from starlette.middleware.cors import CORSMiddleware
 
 
@@ -23,9 +27,13 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     redis_client = await set_async_redis_client()
     FastAPICache.init(RedisBackend(redis_client), prefix="fastapi-cache")
     await FastAPICache.clear()
+    await manager.start()
+    await replica_pool.start()
 
     if not taskiq_broker.is_worker_process:
         await taskiq_broker.startup()
+    if settings.GPT_EXECUTION_MODE == ExecutionModeEnum.QUEUE and not gpt_broker.is_worker_process:
+        await gpt_broker.startup()
 
     await setup_handlers(application)
     async with application:
@@ -33,8 +41,15 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         yield
         await application.stop()
 
+    await history_writer.stop()
+    await OpenAIClientRegistry.close()
+    await manager.stop()
+    await replica_pool.stop()
+
     if not taskiq_broker.is_worker_process:
         await taskiq_broker.shutdown()
+    if settings.GPT_EXECUTION_MODE == ExecutionModeEnum.QUEUE and not gpt_broker.is_worker_process:
+        await gpt_broker.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -1,17 +1,29 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Form, Query
 from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.crud import current_active_user, image_dao
+from src.crud import current_active_user, current_superuser, image_dao
 from src.db.deps import get_async_session
 from src.models.user_model import User
+from src.schemas.image_schema import ImageDAOResponse
+from src.schemas.pagination_schema import CursorPage
 from src.tasks.image_tasks import process_image_task
 from starlette import status
 
 media_router = APIRouter()
 
 
+@media_router.get("/images/cursor/", response_model=CursorPage[ImageDAOResponse], status_code=status.HTTP_200_OK)
+async def get_images_by_cursor(
+    cursor: Optional[str] = Query(None),
+    size: int = Query(50, ge=1, le=100),
+    _: User = Depends(current_superuser), db_session: AsyncSession = Depends(get_async_session)
+):
+    images, next_cursor = await image_dao.get_multi_by_cursor(cursor=cursor, limit=size, db_session=db_session)
+    return CursorPage(items=images, next_cursor=next_cursor, size=size)
+
+
 @media_router.get("/images/{image_id}", status_code=status.HTTP_200_OK)
 async def get_image(image_id: UUID4, db_session: AsyncSession = Depends(get_async_session)):
     image = await image_dao.get(id=image_id, db_session=db_session)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from src.ai.gpt.lanes import GenerationLanes
+from src.crud import current_superuser
+from src.models.user_model import User
+from src.utils.metrics import Metrics
+from src.websocket import manager
+from starlette import status
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/", status_code=status.HTTP_200_OK)
+async def get_metrics(_: User = Depends(current_superuser)):
+    return {
+        **Metrics.snapshot(),
+        'gpt_lane_depths': await GenerationLanes.queue_depths(),
+        'ws_connections': manager.stats(),
+    }
@@ -1,4 +1,5 @@
 from .ai_model import AIModels, GPTPrompt
+from .ai_summary_model import AISummary
 from .ai_transaction_model import AITransactions
 from .ai_user_models import UserAIModel
 from .city_model import City
@@ -8,6 +9,7 @@ from .tg_group_model import TgGroup
 from .user_model import User
 
 __all__ = (
+    'AISummary',
     'AITransactions',
     'AIModels',
     'GPTPrompt',
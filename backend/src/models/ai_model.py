@@ -1,6 +1,7 @@
-from typing import TYPE_CHECKING, List
+import uuid
+from typing import TYPE_CHECKING, List, Optional
 
-from sqlalchemy import DECIMAL, Boolean, Integer, String, Text
+from sqlalchemy import DECIMAL, JSON, Boolean, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy_utils import ChoiceType
 from src.models.base_model import Base
@@ -21,10 +22,13 @@ class AIModels(Base):
     )
     title_public: Mapped[str] = mapped_column(String(28), nullable=False)
     title_model: Mapped[str] = mapped_column(String(28), nullable=False)
+    encoding: Mapped[str] = mapped_column(String(28), nullable=True)
     api_key: Mapped[str] = mapped_column(String(100), nullable=False)
+    base_url: Mapped[str] = mapped_column(String(255), nullable=True)
 
     is_default: Mapped[bool] = mapped_column(Boolean, default=False)
     is_free: Mapped[bool] = mapped_column(Boolean, default=False)
+    allow_response_cache: Mapped[bool] = mapped_column(Boolean, default=False)
 
     incoming_price: Mapped[DECIMAL] = mapped_column(DECIMAL(6, 2), default=0)
     outgoing_price: Mapped[DECIMAL] = mapped_column(DECIMAL(6, 2), default=0)
@@ -32,6 +36,13 @@ class AIModels(Base):
     context_window: Mapped[int] = mapped_column(Integer, nullable=False)
     max_request_token: Mapped[int] = mapped_column(Integer, nullable=False)
     time_window: Mapped[int] = mapped_column(Integer, default=30)
+    rpm_limit: Mapped[int] = mapped_column(Integer, nullable=True)
+    tpm_limit: Mapped[int] = mapped_column(Integer, nullable=True)
+
+    fallback_model_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("ai_models.id", ondelete="SET NULL"), nullable=True)
+    fallback_model: Mapped[Optional["AIModels"]] = relationship(
+        "AIModels", remote_side="AIModels.id", foreign_keys=[fallback_model_id]
+    )
 
     consumer: Mapped[ConsumerEnum] = mapped_column(
         ChoiceType(ConsumerEnum, impl=String()),
@@ -53,6 +64,7 @@ class GPTPrompt(Base):
 
     en_prompt_text: Mapped[str] = mapped_column(Text, nullable=False)
     ru_prompt_text: Mapped[str] = mapped_column(Text, nullable=False)
+    en_prompt_tokens: Mapped[dict] = mapped_column(JSON, default=dict, nullable=False)
 
     is_default: Mapped[bool] = mapped_column(Boolean, default=False)
 
@@ -0,0 +1,25 @@
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import DateTime, ForeignKey, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from src.models.base_model import Base
+
+if TYPE_CHECKING:
+    from src.models import UserAIModel
+
+
+class AISummary(Base):
+    __tablename__ = 'ai_summaries'
+
+    summary: Mapped[str] = mapped_column(Text, nullable=False)
+    summary_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    time_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    summarized_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    user_ai_model_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("user_ai_models.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    user_ai_model: Mapped["UserAIModel"] = relationship("UserAIModel", foreign_keys=[user_ai_model_id])
@@ -1,7 +1,8 @@
 import uuid
+from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import DECIMAL, ForeignKey, Integer, String, Text
+from sqlalchemy import DECIMAL, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy_utils import ChoiceType
 from src.models.base_model import Base
@@ -13,6 +14,19 @@ if TYPE_CHECKING:
 
 class AITransactions(Base):
     __tablename__ = 'ai_transactions'
+    __table_args__ = (
+        # история диалога: фильтр по user_ai_model_id и диапазону created_at, токены без чтения строк
+        Index(
+            'ix_ai_transactions_user_ai_model_id_created_at', 'user_ai_model_id', 'created_at',
+            postgresql_include=['question_tokens', 'answer_tokens'],
+        ),
+        Index('ix_ai_transactions_created_at_id', 'created_at', 'id'),
+        # месячные секции создаются задачей create_ai_transactions_partitions_task
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+
+    # ключ секционирования входит в первичный ключ
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, default=func.now())
 
     chat_id: Mapped[str] = mapped_column(String(128), nullable=True)
 
@@ -25,6 +39,7 @@ class AITransactions(Base):
     answer_token_price: Mapped[DECIMAL] = mapped_column(DECIMAL(6, 2), default=0)
 
     image: Mapped[str] = mapped_column(String, nullable=True)
+    is_truncated: Mapped[bool] = mapped_column(Boolean, default=False)
 
     consumer: Mapped[ConsumerEnum] = mapped_column(
         ChoiceType(ConsumerEnum, impl=String()),
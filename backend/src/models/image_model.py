@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, List
 
-from sqlalchemy import Boolean
+from sqlalchemy import Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.conf import media_storage
 from src.models.base_model import Base
@@ -14,6 +14,7 @@ if TYPE_CHECKING:
 
 class Image(Base):
     __tablename__ = "images"
+    __table_args__ = (Index('ix_images_created_at_id', 'created_at', 'id'),)
     _file_storage = media_storage
 
     file: Mapped[str] = mapped_column(FilePath(_file_storage), nullable=True)
@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING, List, Optional
 
 from fastapi_users.db import SQLAlchemyBaseUserTable
-from sqlalchemy import BigInteger, Boolean, String
+from sqlalchemy import BigInteger, Boolean, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.models.base_model import Base
 from src.models.interim_tables import (approved_user_models,
@@ -15,6 +15,7 @@ if TYPE_CHECKING:
 
 class User(SQLAlchemyBaseUserTable, Base):
     __tablename__ = "users"
+    __table_args__ = (Index('ix_users_created_at_id', 'created_at', 'id'),)
 
     first_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     last_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
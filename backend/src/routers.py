@@ -1,15 +1,20 @@
 from src.db.deps import get_user_db
 from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import json
 from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
 from src.ai.gpt.open_ai import OpenAIProvider
+from src.ai.gpt.stream_log import StreamLog
 from src.auth.routers import auth_router, users_router
+from src.conf import logger, settings
 from src.crud.user_crud import authenticate_websocket_user
 from src.media.routers import media_router
+from src.metrics.routers import metrics_router
 from src.models.user_model import User
+from src.schemas.common_schema import StreamModeEnum
 from src.tgbot.routers import tg_router
 from src.users.routers import account_router
 from src.websocket import manager
@@ -19,6 +24,7 @@ main_router.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 main_router.include_router(users_router, prefix="/api/users", tags=["users"])
 main_router.include_router(account_router, prefix="/api/users-account", tags=["users-account"])
 main_router.include_router(media_router, prefix="/api/assets", tags=["assets"])
+main_router.include_router(metrics_router, prefix="/api/metrics", tags=["metrics"])
 main_router.include_router(tg_router, prefix="/bot", tags=["tgbot"])
 
 
@@ -35,36 +41,85 @@ async def get_optional_user(
     return None
 
 
+async def generate_answers(queue: asyncio.Queue, user: Optional[User], chat_id: UUID) -> None:
+    """
+    Последовательно генерирует ответы на сообщения одного подключения.
+    Генерация идёт отдельно от чтения сокета, поэтому отключение клиента обнаруживается сразу.
+    """
+    while (item := await queue.get()) is not None:
+        text, stream_mode = item
+        if not await manager.has_listeners(chat_id):
+            continue
+        creativity_controls = {
+            'temperature': 0.8,
+            'top_p': 1,
+            'max_tokens': 3000,
+            'frequency_penalty': 0,
+            'presence_penalty': 0,
+        }
+        gpt_manager = OpenAIProvider(
+            query_text=text,
+            user=user,
+            chat_id=chat_id,
+            creativity_controls=creativity_controls,
+            stream=True,
+            tg_chat=False,
+            stream_mode=stream_mode,
+        )
+        try:
+            await gpt_manager.get_gpt_response()
+        except Exception as err:
+            logger.error(f"Failed to answer in chat {chat_id}: {err}")
+
+
+async def resume_stream(websocket: WebSocket, chat_id: UUID, generation_id: Optional[UUID], last_seq: int) -> None:
+    """
+    Отправляет переподключившемуся клиенту пропущенные кадры генерации и подключает его к живому потоку.
+    Если журнал недоступен, клиент сразу получает живой поток.
+    """
+    try:
+        frames = await StreamLog.replay(chat_id, generation_id, last_seq)
+    except Exception as err:
+        logger.error(f"Failed to replay stream of chat {chat_id}: {err}")
+        frames = []
+    await manager.resume(websocket, chat_id, frames)
+
+
 @main_router.websocket("/ws/{chat_id}")
 async def websocket_endpoint(
     websocket: WebSocket, chat_id: UUID, user: Optional[User] = Depends(get_optional_user),
+    last_seq: Optional[int] = Query(None), generation_id: Optional[UUID] = Query(None),
 ):
-    await manager.connect(websocket, chat_id)
+    """
+    Чат с моделью через веб-сокет.
+
+    Переподключившийся клиент передаёт `last_seq` и `generation_id` последнего полученного кадра
+    и получает пропущенные кадры генерации, а затем живой поток.
+    Без `generation_id` воспроизводится последняя генерация чата, `last_seq=-1` — целиком.
+    """
+    resuming = last_seq is not None and settings.WS_STREAM_LOG_ENABLED
+    await manager.connect(websocket, chat_id, resuming=resuming)
+    if resuming:
+        await resume_stream(websocket, chat_id, generation_id, last_seq)
+    queue: asyncio.Queue = asyncio.Queue()
+    worker = asyncio.create_task(generate_answers(queue, user, chat_id))
     try:
         while True:
             data = await websocket.receive_text()
+            stream_mode = StreamModeEnum.FULL
             try:
                 data_json = json.loads(data)
                 text = data_json.get('text', '')
+                if data_json.get('stream_mode') == StreamModeEnum.DELTA.value:
+                    stream_mode = StreamModeEnum.DELTA
             except json.JSONDecodeError:
                 text = data
 
             if text:
-                creativity_controls = {
-                    'temperature': 0.8,
-                    'top_p': 1,
-                    'max_tokens': 3000,
-                    'frequency_penalty': 0,
-                    'presence_penalty': 0,
-                }
-                gpt_manager = OpenAIProvider(
-                    query_text=text,
-                    user=user,
-                    chat_id=chat_id,
-                    creativity_controls=creativity_controls,
-                    stream=True,
-                    tg_chat=False
-                )
-                await gpt_manager.get_gpt_response()
+                await queue.put((text, stream_mode))
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, chat_id)
+        await queue.put(None)
+        await worker
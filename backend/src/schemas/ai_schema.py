@@ -1,5 +1,6 @@
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, Optional
+from uuid import UUID
 
 from pydantic import BaseModel, Field
 from src.schemas.common_schema import ConsumerEnum, ProviderEnum
@@ -9,14 +10,20 @@ class AIModelCreate(BaseModel):
     provider: ProviderEnum = ProviderEnum.OPEN_AI
     title_public: str = Field(max_length=28)
     title_model: str = Field(max_length=28)
+    encoding: Optional[str] = Field(None, max_length=28)
     api_key: str = Field(max_length=100)
+    base_url: Optional[str] = Field(None, max_length=255)
     is_default: bool = False
     is_free: bool = False
+    allow_response_cache: bool = False
     incoming_price: Decimal = Field(default=0, max_digits=6, decimal_places=2)
     outgoing_price: Decimal = Field(default=0, max_digits=6, decimal_places=2)
     context_window: int
     max_request_token: int
     time_window: int = 30
+    rpm_limit: Optional[int] = None
+    tpm_limit: Optional[int] = None
+    fallback_model_id: Optional[UUID] = None
     consumer: ConsumerEnum = ConsumerEnum.FAST_CHAT
 
     class Config:
@@ -28,14 +35,20 @@ class AIModelUpdate(BaseModel):
     provider: Optional[ProviderEnum] = None
     title_public: Optional[str] = Field(None, max_length=28)
     title_model: Optional[str] = Field(None, max_length=28)
+    encoding: Optional[str] = Field(None, max_length=28)
     api_key: Optional[str] = Field(None, max_length=100)
+    base_url: Optional[str] = Field(None, max_length=255)
     is_default: Optional[bool] = None
     is_free: Optional[bool] = None
+    allow_response_cache: Optional[bool] = None
     incoming_price: Optional[Decimal] = Field(None, max_digits=6, decimal_places=2)
     outgoing_price: Optional[Decimal] = Field(None, max_digits=6, decimal_places=2)
     context_window: Optional[int] = None
     max_request_token: Optional[int] = None
     time_window: Optional[int] = None
+    rpm_limit: Optional[int] = None
+    tpm_limit: Optional[int] = None
+    fallback_model_id: Optional[UUID] = None
     consumer: Optional[ConsumerEnum] = None
 
     class Config:
@@ -47,6 +60,7 @@ class GPTPromptCreate(BaseModel):
     title: str = Field(max_length=28)
     en_prompt_text: str
     ru_prompt_text: str
+    en_prompt_tokens: Dict[str, int] = {}
     is_default: bool = False
     consumer: ConsumerEnum = ConsumerEnum.FAST_CHAT
 
@@ -59,6 +73,7 @@ class GPTPromptUpdate(BaseModel):
     title: Optional[str] = Field(None, max_length=28)
     en_prompt_text: Optional[str] = None
     ru_prompt_text: Optional[str] = None
+    en_prompt_tokens: Optional[Dict[str, int]] = None
     is_default: Optional[bool] = None
     consumer: Optional[ConsumerEnum] = None
 
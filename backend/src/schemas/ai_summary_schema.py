@@ -0,0 +1,15 @@
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AISummaryCreate(BaseModel):
+    summary: str
+    summary_tokens: int = 0
+    time_start: datetime
+    summarized_until: datetime
+    user_ai_model_id: uuid.UUID
+
+    class Config:
+        from_attributes = True
@@ -18,6 +18,7 @@ class AITransactionCreate(BaseModel):
     image: Optional[str] = None
     consumer: ConsumerEnum = ConsumerEnum.FAST_CHAT
     user_ai_model_id: Optional[uuid.UUID] = None
+    is_truncated: bool = False
 
     class Config:
         from_attributes = True
@@ -14,6 +14,39 @@ class ConsumerEnum(Enum):
     IMAGE = 'IMG'
 
 
+class StreamModeEnum(str, Enum):
+    FULL = "full"
+    DELTA = "delta"
+
+
+class SlowConsumerPolicyEnum(str, Enum):
+    DROP = "drop"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+class BroadcastBackendEnum(str, Enum):
+    MEMORY = "memory"
+    REDIS = "redis"
+
+
+class CountStrategyEnum(str, Enum):
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    CACHED = "cached"
+
+
+class ExecutionModeEnum(str, Enum):
+    INLINE = "inline"
+    QUEUE = "queue"
+
+
+class GenerationLaneEnum(str, Enum):
+    PAID = "paid"
+    PRIVATE = "private"
+    GROUP = "group"
+
+
 class ProviderEnum(Enum):
     OPEN_AI = 'OAI'
 
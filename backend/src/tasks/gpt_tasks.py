@@ -0,0 +1,62 @@
+import time
+from uuid import uuid4
+
+from pydantic import UUID4
+from src.ai.gpt.clients import OpenAIClientRegistry
+from src.ai.gpt.history_writer import history_writer
+from src.ai.gpt.lanes import GenerationLanes
+from src.conf import gpt_broker
+from src.db.deps import get_async_session
+from src.models.user_model import User
+from src.schemas.common_schema import GenerationLaneEnum
+from src.tgbot.loader import bot
+from src.tgbot.services.gpt_answer import answer_in_chat
+from src.utils.metrics import Metrics
+from taskiq import Context, TaskiqDepends, TaskiqEvents, TaskiqState
+
+
+@gpt_broker.on_event(TaskiqEvents.WORKER_STARTUP)
+async def startup(state: TaskiqState) -> None:
+    await bot.initialize()
+
+
+@gpt_broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)
+async def shutdown(state: TaskiqState) -> None:
+    await history_writer.stop()
+    await OpenAIClientRegistry.close()
+    await bot.shutdown()
+
+
+@gpt_broker.task
+async def generate_answer_task(
+    query_text: str, chat_id: int, user_id: UUID4 | None, creativity_controls: dict, lane: str, queued_at: float,
+    context: Context = TaskiqDepends(),
+):
+    lane = GenerationLaneEnum(lane)
+    async with GenerationLanes.slot(lane, context.message.task_id):
+        Metrics.observe(f'gpt_lane.{lane.value}.wait_ms', (time.time() - queued_at) * 1000)
+        user = None
+        if user_id:
+            async for session in get_async_session():
+                user = await session.get(User, user_id)
+        await answer_in_chat(query_text, user, chat_id, creativity_controls)
+
+
+async def enqueue_answer(query_text: str, user: User | None, chat_id: int, chat_type: str, creativity_controls: dict) -> None:
+    """Ставит генерацию ответа в очередь воркеров с приоритетом полосы запроса."""
+    lane = await GenerationLanes.resolve(chat_type, user)
+    task_id = uuid4().hex
+    await GenerationLanes.enqueue(lane, task_id)
+    try:
+        kicker = generate_answer_task.kicker().with_task_id(task_id).with_labels(priority=GenerationLanes.PRIORITIES[lane])
+        await kicker.kiq(
+            query_text=query_text,
+            chat_id=chat_id,
+            user_id=user.id if user else None,
+            creativity_controls=creativity_controls,
+            lane=lane.value,
+            queued_at=time.time(),
+        )
+    except Exception:
+        await GenerationLanes.dequeue(lane, task_id)
+        raise
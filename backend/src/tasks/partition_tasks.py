@@ -0,0 +1,13 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.conf import settings, taskiq_broker
+from src.crud import ai_transaction_dao
+from src.db.deps import get_async_session
+from taskiq import TaskiqDepends
+
+
+@taskiq_broker.task(schedule=[{"cron": "0 3 * * *"}])
+async def create_ai_transactions_partitions_task(db_session: AsyncSession = TaskiqDepends(get_async_session)):
+    partitions = await ai_transaction_dao.create_partitions(
+        months_ahead=settings.AI_TRANSACTIONS_PARTITIONS_AHEAD, db_session=db_session,
+    )
+    return f"Ensured partitions {', '.join(partitions)}"
@@ -0,0 +1,15 @@
+from pydantic import UUID4
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.ai.gpt.summarizer import ConversationSummarizer
+from src.conf import taskiq_broker
+from src.db.deps import get_async_session
+from taskiq import TaskiqDepends
+
+
+@taskiq_broker.task
+async def summarize_conversation_task(user_ai_model_id: UUID4, db_session: AsyncSession = TaskiqDepends(get_async_session)):
+    try:
+        await ConversationSummarizer().summarize(user_ai_model_id, db_session)
+    finally:
+        await ConversationSummarizer.unlock(user_ai_model_id)
+    return f"Successfully summarized conversation {user_ai_model_id}"
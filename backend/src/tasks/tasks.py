@@ -1,7 +1,11 @@
 from .db_task import dump_db
 from .image_tasks import process_image_task
+from .partition_tasks import create_ai_transactions_partitions_task
+from .summary_tasks import summarize_conversation_task
 
 __all__ = (
     'process_image_task',
     'dump_db',
+    'summarize_conversation_task',
+    'create_ai_transactions_partitions_task',
 )
@@ -1,12 +1,12 @@
 import asyncio
 
 import httpx
-from src.ai.gpt.open_ai import OpenAIProvider
 from src.conf import settings
 from src.conf.fastapi import ModeEnum
-from src.tgbot.services.message_handler import send_message_to_chat
+from src.schemas.common_schema import ExecutionModeEnum
+from src.tasks.gpt_tasks import enqueue_answer
+from src.tgbot.services.gpt_answer import answer_in_chat
 from telegram import Update
-from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
 
 from ..services.registrar import get_user
@@ -20,6 +20,14 @@ creativity_controls = {
 }
 
 
+async def answer(text: str, user, chat_type: str, chat_id: int, creativity_controls: dict) -> None:
+    """Отвечает в чат в процессе вебхука или ставит генерацию в очередь воркеров."""
+    if settings.GPT_EXECUTION_MODE == ExecutionModeEnum.QUEUE:
+        await enqueue_answer(text, user, chat_id, chat_type, creativity_controls)
+    else:
+        await answer_in_chat(text, user, chat_id, creativity_controls)
+
+
 async def check_registration(update: Update, context: ContextTypes.DEFAULT_TYPE):
     allow_unregistered = True
     prefetch_related = ['active_model']
@@ -49,14 +57,7 @@ async def check_request_in_distributor(update: Update, context: ContextTypes.DEF
         'frequency_penalty': 0,
         'presence_penalty': 0,
     }
-    gpt_manager = OpenAIProvider(
-        query_text=text,
-        user=user,
-        chat_id=chat_id,
-        creativity_controls=creativity_controls
-    )
-    await gpt_manager.get_gpt_response()
-    await send_message_to_chat(chat_id, gpt_manager.return_text, parse_mode=ParseMode.MARKDOWN)
+    await answer(text, user, update.effective_chat.type, chat_id, creativity_controls)
 
     # completion = json.loads(response.content)
 
@@ -79,14 +80,7 @@ async def check_request(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = await check_registration(update, context)
     text = update.effective_message.text
     chat_id = update.effective_chat.id
-    gpt_manager = OpenAIProvider(
-        query_text=text,
-        user=user,
-        chat_id=chat_id,
-        creativity_controls=creativity_controls
-    )
-    await gpt_manager.get_gpt_response()
-    await send_message_to_chat(chat_id, gpt_manager.return_text, parse_mode=ParseMode.MARKDOWN)
+    await answer(text, user, update.effective_chat.type, chat_id, creativity_controls)
 
 
 async def get_answer_chat_gpt_public(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -0,0 +1,20 @@
+from src.ai.gpt.open_ai import OpenAIProvider
+from src.conf import settings
+from src.models.user_model import User
+from telegram.constants import ParseMode
+
+from .message_handler import send_message_to_chat
+
+
+async def answer_in_chat(query_text: str, user: User | None, chat_id: int, creativity_controls: dict) -> None:
+    """Получает ответ модели и отправляет его в чат Телеграм, если он не был передан потоком."""
+    gpt_manager = OpenAIProvider(
+        query_text=query_text,
+        user=user,
+        chat_id=chat_id,
+        creativity_controls=creativity_controls,
+        stream=settings.TG_STREAM_ANSWERS,
+    )
+    await gpt_manager.get_gpt_response()
+    if not gpt_manager.streamed:
+        await send_message_to_chat(chat_id, gpt_manager.return_text, parse_mode=ParseMode.MARKDOWN)
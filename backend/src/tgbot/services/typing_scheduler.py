@@ -0,0 +1,71 @@
+import asyncio
+from itertools import count
+
+from telegram.constants import ChatAction
+from telegram.error import TelegramError
+
+from ..loader import bot, logger
+
+
+class TypingScheduler:
+    """
+    Единый планировщик статуса TYPING для чатов Телеграм.
+
+    Хранит чаты, в которых генерируются ответы, и запросы в работе по каждому со своим сроком.
+    Одна фоновая задача отправляет не больше одного действия на чат за `INTERVAL` секунд.
+    Чат снимается сразу после завершения или истечения срока последнего запроса в нём.
+    """
+    INTERVAL = 4    # Телеграм показывает typing 5 секунд
+    TICK = 0.5
+
+    def __init__(self):
+        self.chats: dict[int, dict] = {}
+        self._tokens = count()
+        self._task: asyncio.Task | None = None
+
+    def add(self, chat_id: int, max_time: float) -> int:
+        """
+        Регистрирует запрос в чате. Typing по запросу отправляется не дольше `max_time` секунд.
+        Возвращает токен запроса для `remove`.
+        """
+        token = next(self._tokens)
+        deadline = asyncio.get_running_loop().time() + max_time
+        chat = self.chats.setdefault(chat_id, {'requests': {}, 'next_send': 0.0})
+        chat['requests'][token] = deadline
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return token
+
+    def remove(self, chat_id: int, token: int) -> None:
+        """Снимает запрос в чате. Запрос с истёкшим сроком уже снят, и другие запросы чата не затрагиваются."""
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            return
+        chat['requests'].pop(token, None)
+        if not chat['requests']:
+            del self.chats[chat_id]
+
+    async def send(self, chat_id: int) -> None:
+        try:
+            await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
+        except TelegramError as err:
+            logger.error(f"Failed to send typing to chat {chat_id}: {err}")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.chats:
+            now = loop.time()
+            due = []
+            for chat_id, chat in list(self.chats.items()):
+                chat['requests'] = {token: deadline for token, deadline in chat['requests'].items() if now <= deadline}
+                if not chat['requests']:
+                    del self.chats[chat_id]
+                elif now >= chat['next_send']:
+                    chat['next_send'] = now + self.INTERVAL
+                    due.append(chat_id)
+            if due:
+                await asyncio.gather(*(self.send(chat_id) for chat_id in due))
+            await asyncio.sleep(self.TICK)
+
+
+typing_scheduler = TypingScheduler()
@@ -1,13 +1,31 @@
-from fastapi import APIRouter, Depends, File, Form, UploadFile
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, Form, Query, UploadFile
 from pydantic import UUID4
-from src.crud import UserManager, get_current_active_user_and_manager
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.crud import (UserManager, current_superuser,
+                      get_current_active_user_and_manager, user_dao)
+from src.db.deps import get_async_session
+from src.models.user_model import User
 from src.schemas.image_schema import (ImageDAOResponse, UploadImageResponse,
                                       UploadUrlImageResponse)
+from src.schemas.pagination_schema import CursorPage
+from src.schemas.user_schema import UserRead
 from starlette import status
 
 account_router = APIRouter()
 
 
+@account_router.get("/users", response_model=CursorPage[UserRead], status_code=status.HTTP_200_OK)
+async def get_users_by_cursor(
+    cursor: Optional[str] = Query(None),
+    size: int = Query(50, ge=1, le=100),
+    _: User = Depends(current_superuser), db_session: AsyncSession = Depends(get_async_session)
+):
+    users, next_cursor = await user_dao.get_multi_by_cursor(cursor=cursor, limit=size, db_session=db_session)
+    return CursorPage(items=users, next_cursor=next_cursor, size=size)
+
+
 @account_router.post("/upload-image", response_model=UploadImageResponse, status_code=status.HTTP_201_CREATED)
 async def upload_user_image(
     file: UploadFile = File(...),
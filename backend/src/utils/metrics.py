@@ -0,0 +1,44 @@
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """
+    Метрики процесса: счётчики, текущие значения и тайминги.
+    Значения хранятся в памяти процесса, каждый воркер gunicorn/taskiq отдаёт свои.
+    """
+    _counters: Dict[str, float] = defaultdict(float)
+    _gauges: Dict[str, float] = {}
+    _timings: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def inc(cls, name: str, value: float = 1) -> None:
+        """Увеличивает счётчик."""
+        cls._counters[name] += value
+
+    @classmethod
+    def set(cls, name: str, value: float) -> None:
+        """Устанавливает текущее значение."""
+        cls._gauges[name] = value
+
+    @classmethod
+    def observe(cls, name: str, value: float) -> None:
+        """Добавляет измерение времени в миллисекундах."""
+        timing = cls._timings.setdefault(name, {'count': 0, 'sum': 0.0, 'max': 0.0, 'last': 0.0})
+        timing['count'] += 1
+        timing['sum'] += value
+        timing['max'] = max(timing['max'], value)
+        timing['last'] = value
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """Возвращает копию всех метрик процесса."""
+        timings = {
+            name: {**timing, 'avg': timing['sum'] / timing['count'] if timing['count'] else 0.0}
+            for name, timing in cls._timings.items()
+        }
+        return {
+            'counters': dict(cls._counters),
+            'gauges': dict(cls._gauges),
+            'timings': timings,
+        }
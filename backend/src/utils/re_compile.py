@@ -15,3 +15,22 @@ SUBCHAPTER_RE = re.compile(r'^(\d+\.\d+)\.?\s+(.+)$', re.M)
 DESCRIPTION_RE = re.compile(r'^\s*([^\d].+)$', re.M)
 NUMBER_RE = re.compile(r'^\d')
 PUNCTUATION_RE = re.compile(r'[^\w\s]')
+MARKDOWN_FENCE_RE = re.compile(r'^\s*(?:```|~~~)')
+MARKDOWN_BLOCK_RE = re.compile(r'^\s*(?:>\s*)*(?:(?:[*+-]|\d+\.)\s+)*')
+MARKDOWN_HTML_BLOCK_RE = re.compile(
+    r'^\s*<(?:!|/?(?:address|article|aside|blockquote|body|canvas|center|colgroup|dd|details|div|dl|dt|fieldset|'
+    r'figcaption|figure|footer|form|group|h[1-6]|header|hgroup|hr|html|iframe|legend|li|main|map|math|menu|nav|'
+    r'noscript|object|ol|option|output|p|pre|progress|script|section|style|summary|table|tbody|td|textarea|tfoot|'
+    r'th|thead|tr|ul|video)\b)'
+)
+MARKDOWN_RAW_TEXT_RE = re.compile(r'<(script|style)\b[^>\n]*>(?!.*</\1\s*>)')
+MARKDOWN_INLINE_RE = re.compile(
+    r'(?P<code>`[^`\n]+`)'
+    r'|!\[[^\]\n]*\]\([^)\n]*\)'
+    r'|\[(?P<link>[^\]\n]*)\]\([^)\n]*\)'
+    r'|<(?P<autolink>(?:https?|ftp)://[^<>\n]*|[^<> !\n]+@[^@<> \n]+)>'
+    r'|<(?P<raw>script|style)\b[^>\n]*>.*?</(?P=raw)\s*>'
+    r'|<[/!]?[A-Za-z][^>\n]*>'
+    r'|(?P<entity>&(?:#\d+|#[xX][0-9a-fA-F]+|[A-Za-z]\w*);)'
+    r'|(?<!\w)_+|_+(?!\w)'
+)
@@ -1,31 +1,348 @@
-from typing import Dict, List
-from uuid import UUID
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Awaitable, Callable, Dict, List
+from uuid import UUID, uuid4
 
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect, status
+from redis.asyncio.client import PubSub
+from src.conf import logger, settings
+from src.conf.redis import AsyncRedisClient
+from src.schemas.common_schema import BroadcastBackendEnum, SlowConsumerPolicyEnum
+from src.utils.metrics import Metrics
 
+logger = logger.getChild(__name__)
+
+Deliver = Callable[[str, dict | str, bool], Awaitable[None]]
+
+
+class Connection:
+    """
+    Подключение к чату с собственной очередью отправки.
+
+    Кадры отправляются отдельной задачей, поэтому медленный клиент не задерживает
+    остальные подключения чата и генерацию ответа. При заполнении очереди
+    до `WS_SEND_QUEUE_SIZE` применяется политика `WS_SLOW_CONSUMER_POLICY`:
+    отбросить промежуточные кадры, объединить их или отключить клиента.
+    Служебные кадры (начало и конец ответа) не отбрасываются.
+
+    Пока подключению воспроизводятся пропущенные кадры (`resuming`), новые кадры
+    откладываются и ставятся в очередь после воспроизведения без повторов.
+    """
+
+    def __init__(self, websocket: WebSocket, chat_id: UUID, manager: "ConnectionManager", resuming: bool = False):
+        self.websocket = websocket
+        self.chat_id = chat_id
+        self.manager = manager
+        self.resuming = resuming
+        self.held: list[tuple[dict | str, bool]] = []
+        self.queue: deque = deque()      # (кадр, можно ли отбросить, время постановки)
+        self.ready = asyncio.Event()
+        self.lag_ms = 0.0                # задержка последнего отправленного кадра в очереди
+        self.max_lag_ms = 0.0
+        self.dropped = 0
+        self.coalesced = 0
+        self.task = asyncio.create_task(self._writer())
+
+    @staticmethod
+    def merge(queued: dict | str, frame: dict | str) -> dict | str:
+        """Объединяет два промежуточных кадра: дельты склеиваются, полный текст заменяется новым."""
+        if isinstance(queued, dict) and isinstance(frame, dict) and frame.get('is_delta'):
+            return {**frame, 'message': queued['message'] + frame['message']}
+        return frame
+
+    def put(self, frame: dict | str, droppable: bool) -> bool:
+        """Ставит кадр в очередь. Возвращает False, если клиента нужно отключить."""
+        if self.resuming:
+            self.held.append((frame, droppable))
+            return True
+        if len(self.queue) >= settings.WS_SEND_QUEUE_SIZE and droppable:
+            if settings.WS_SLOW_CONSUMER_POLICY == SlowConsumerPolicyEnum.DISCONNECT:
+                return False
+            if settings.WS_SLOW_CONSUMER_POLICY == SlowConsumerPolicyEnum.COALESCE:
+                if self.queue[-1][1]:
+                    queued, _, enqueued_at = self.queue[-1]
+                    self.queue[-1] = (self.merge(queued, frame), True, enqueued_at)
+                    self.coalesced += 1
+                    Metrics.inc('ws.frames_coalesced')
+                    return True
+            else:
+                self.dropped += 1
+                Metrics.inc('ws.frames_dropped')
+                oldest = next((index for index, item in enumerate(self.queue) if item[1]), None)
+                if oldest is None:
+                    return True
+                del self.queue[oldest]
+
+        self.queue.append((frame, droppable, time.monotonic()))
+        self.ready.set()
+        return True
+
+    def resume(self, frames: list[dict]) -> bool:
+        """Ставит в очередь воспроизведённые кадры, затем отложенные, пропуская уже воспроизведённые."""
+        replayed = {frame['generation_id']: frame['seq'] for frame in frames}
+        held, self.held, self.resuming = self.held, [], False
+        queued = [(frame, frame['seq'] > 0 and not frame['is_end']) for frame in frames]
+        for frame, droppable in held:
+            if isinstance(frame, dict) and frame.get('seq', 0) <= replayed.get(frame.get('generation_id'), -1):
+                continue
+            queued.append((frame, droppable))
+        return all(self.put(frame, droppable) for frame, droppable in queued)
+
+    async def _writer(self) -> None:
+        while True:
+            while not self.queue:
+                self.ready.clear()
+                await self.ready.wait()
+            frame, _, enqueued_at = self.queue.popleft()
+            try:
+                await self.websocket.send_text(frame if isinstance(frame, str) else json.dumps(frame))
+            except (WebSocketDisconnect, RuntimeError):
+                self.manager.disconnect(self.websocket, self.chat_id)
+                return
+            self.lag_ms = (time.monotonic() - enqueued_at) * 1000
+            self.max_lag_ms = max(self.max_lag_ms, self.lag_ms)
+            Metrics.observe('ws.send_lag_ms', self.lag_ms)
+
+    def close(self) -> None:
+        self.task.cancel()
+
+    async def abort(self) -> None:
+        """Закрывает сокет медленного клиента."""
+        with suppress(RuntimeError):
+            await self.websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    def stats(self) -> dict:
+        return {
+            'chat_id': str(self.chat_id),
+            'queue_depth': len(self.queue),
+            'lag_ms': self.lag_ms,
+            'max_lag_ms': self.max_lag_ms,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
+
+
+class BroadcastBackend:
+    """Доставка сообщений чата подключениям в других процессах. Базовая реализация ничего не передаёт."""
+
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def subscribe(self, chat_id: str) -> None:
+        pass
+
+    async def unsubscribe(self, chat_id: str) -> None:
+        pass
+
+    async def publish(self, chat_id: str, message: dict | str, droppable: bool) -> None:
+        pass
+
+    async def has_listeners(self, chat_id: str) -> bool:
+        return False
+
+
+class RedisBroadcast(BroadcastBackend):
+    """
+    Рассылка сообщений чата между процессами через Redis pub/sub.
+
+    Каждый процесс подписан только на каналы чатов со своими подключениями.
+    Сообщение публикуется с идентификатором процесса-отправителя, свои сообщения
+    процесс пропускает: локальные подключения получают их без сериализации.
+    Число подписчиков канала кешируется на `LISTENERS_TTL` секунд,
+    так как проверяется на каждом фрагменте ответа.
+    При обрыве соединения подписка восстанавливается на все каналы процесса
+    с паузой от `RECONNECT_DELAY_MIN` до `RECONNECT_DELAY_MAX` секунд.
+    """
+    PREFIX = "ws_chat"
+    LISTENERS_TTL = 1.0
+    RECONNECT_DELAY_MIN = 0.5
+    RECONNECT_DELAY_MAX = 30.0
 
-class ConnectionManager:
     def __init__(self):
-        self.chats: Dict[str, List[WebSocket]] = {}
+        self.origin = uuid4().hex
+        self.pubsub: PubSub | None = None
+        self.deliver: Deliver | None = None
+        self.listeners: Dict[str, tuple[float, bool]] = {}
+        self.channels: set[str] = set()     # каналы чатов с подключениями процесса
+        self._task: asyncio.Task | None = None
+
+    def channel(self, chat_id: str) -> str:
+        return f"{self.PREFIX}:{chat_id}"
+
+    async def start(self, deliver: Deliver) -> None:
+        self.deliver = deliver
+        await self._connect()
+        self._task = asyncio.create_task(self._listen())
+
+    async def _connect(self) -> None:
+        pubsub = AsyncRedisClient.get_client().pubsub(ignore_subscribe_messages=True)
+        # служебный канал процесса держит подписку открытой, пока нет ни одного чата
+        await pubsub.subscribe(self.channel(f"worker:{self.origin}"), *self.channels)
+        self.pubsub = pubsub
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        if self.pubsub:
+            await self.pubsub.aclose()
+
+    async def subscribe(self, chat_id: str) -> None:
+        self.channels.add(self.channel(chat_id))
+        if self.pubsub:
+            await self.pubsub.subscribe(self.channel(chat_id))
+
+    async def unsubscribe(self, chat_id: str) -> None:
+        self.channels.discard(self.channel(chat_id))
+        if self.pubsub:
+            await self.pubsub.unsubscribe(self.channel(chat_id))
+
+    async def publish(self, chat_id: str, message: dict | str, droppable: bool) -> None:
+        envelope = json.dumps({'origin': self.origin, 'message': message, 'droppable': droppable})
+        await AsyncRedisClient.get_client().publish(self.channel(chat_id), envelope)
+
+    async def has_listeners(self, chat_id: str) -> bool:
+        """Есть ли подписчики чата в других процессах."""
+        now = time.monotonic()
+        cached = self.listeners.get(chat_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        [(_, count)] = await AsyncRedisClient.get_client().pubsub_numsub(self.channel(chat_id))
+        self.listeners[chat_id] = (now + self.LISTENERS_TTL, count > 0)
+        return count > 0
+
+    async def _listen(self) -> None:
+        delay = self.RECONNECT_DELAY_MIN
+        while True:
+            try:
+                async for item in self.pubsub.listen():
+                    delay = self.RECONNECT_DELAY_MIN
+                    await self._receive(item)
+                error = "subscription closed"
+            except Exception as err:
+                error = err
+            logger.warning(f"Broadcast subscription lost, reconnecting in {delay:.1f}s: {error}")
+            Metrics.inc('ws.broadcast_reconnects')
+            await self._reconnect(delay)
+            delay = min(delay * 2, self.RECONNECT_DELAY_MAX)
+
+    async def _reconnect(self, delay: float) -> None:
+        """Закрывает оборванную подписку и после паузы подписывается заново на каналы процесса."""
+        with suppress(Exception):
+            await self.pubsub.aclose()
+        await asyncio.sleep(delay)
+        try:
+            await self._connect()
+        except Exception as err:
+            logger.error(f"Failed to restore broadcast subscription: {err}")
+        else:
+            logger.info(f"Broadcast subscription restored, channels: {len(self.channels)}")
+
+    async def _receive(self, item: dict) -> None:
+        try:
+            envelope = json.loads(item['data'])
+            if envelope['origin'] == self.origin:
+                return
+            chat_id = item['channel'].split(':', 1)[1]
+            Metrics.inc('ws.broadcast_received')
+            await self.deliver(chat_id, envelope['message'], envelope['droppable'])
+        except Exception as err:
+            logger.error(f"Failed to deliver broadcast message from {item.get('channel')}: {err}")
 
-    async def connect(self, websocket: WebSocket, chat_id: UUID):
+
+class ConnectionManager:
+    """
+    Подключения к чатам текущего процесса.
+
+    Сообщения чата ставятся в очереди локальных подключений напрямую и передаются
+    подключениям других процессов через `backend`.
+    """
+
+    def __init__(self, backend: BroadcastBackend):
+        self.chats: Dict[str, List[Connection]] = {}
+        self.backend = backend
+
+    async def start(self) -> None:
+        await self.backend.start(self.deliver)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    async def connect(self, websocket: WebSocket, chat_id: UUID, resuming: bool = False):
+        """Подключает сокет к чату. С `resuming` новые кадры откладываются до вызова `resume`."""
         await websocket.accept()
-        if chat_id not in self.chats:
-            self.chats[chat_id] = []
-        self.chats[chat_id].append(websocket)
+        key = str(chat_id)
+        if key not in self.chats:
+            self.chats[key] = []
+            await self.backend.subscribe(key)
+        self.chats[key].append(Connection(websocket, chat_id, self, resuming))
+
+    async def resume(self, websocket: WebSocket, chat_id: UUID, frames: list[dict]) -> None:
+        """Отправляет подключению пропущенные кадры и продолжает живой поток."""
+        key = str(chat_id)
+        connection = next((item for item in self.chats.get(key, []) if item.websocket is websocket), None)
+        if connection is None:
+            return
+        Metrics.inc('ws.resumed')
+        Metrics.inc('ws.replayed_frames', len(frames))
+        if not connection.resume(frames):
+            Metrics.inc('ws.slow_consumer_disconnects')
+            self.disconnect(websocket, key)
+            asyncio.create_task(connection.abort())
+
+    def disconnect(self, websocket: WebSocket, chat_id: UUID | str):
+        key = str(chat_id)
+        connections = self.chats.get(key, [])
+        for connection in connections:
+            if connection.websocket is websocket:
+                connection.close()
+                connections.remove(connection)
+                break
+        if not connections and self.chats.pop(key, None) is not None:
+            asyncio.create_task(self._unsubscribe(key))
 
-    def disconnect(self, websocket: WebSocket, chat_id: str):
-        self.chats[chat_id].remove(websocket)
-        if not self.chats[chat_id]:
-            del self.chats[chat_id]
+    async def _unsubscribe(self, key: str) -> None:
+        # подключение могло вернуться, пока задача ждала запуска
+        if key not in self.chats:
+            await self.backend.unsubscribe(key)
+
+    async def has_listeners(self, chat_id: UUID | str) -> bool:
+        """Есть ли в чате открытые соединения в этом или другом процессе."""
+        key = str(chat_id)
+        return bool(self.chats.get(key)) or await self.backend.has_listeners(key)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
-    async def send_message_to_chat(self, message: str, chat_id: str):
-        if chat_id in self.chats:
-            for connection in self.chats[chat_id]:
-                await connection.send_text(message)
+    async def send_message_to_chat(self, message: str | dict, chat_id: UUID | str, droppable: bool = False):
+        """
+        Ставит сообщение в очереди отправки всех подключений чата и передаёт его другим процессам.
+        `droppable` отмечает промежуточные кадры, которые можно отбросить или объединить у медленного клиента.
+        """
+        key = str(chat_id)
+        await self.deliver(key, message, droppable)
+        await self.backend.publish(key, message, droppable)
+
+    async def deliver(self, chat_id: str, message: str | dict, droppable: bool) -> None:
+        """Ставит сообщение в очереди отправки подключений чата в этом процессе."""
+        for connection in list(self.chats.get(chat_id, [])):
+            if not connection.put(message, droppable):
+                Metrics.inc('ws.slow_consumer_disconnects')
+                self.disconnect(connection.websocket, chat_id)
+                asyncio.create_task(connection.abort())
+
+    def stats(self) -> List[dict]:
+        """Возвращает состояние очередей отправки всех подключений."""
+        return [connection.stats() for connections in self.chats.values() for connection in connections]
 
 
-manager = ConnectionManager()
+manager = ConnectionManager(
+    RedisBroadcast() if settings.WS_BROADCAST_BACKEND == BroadcastBackendEnum.REDIS else BroadcastBackend()
+)
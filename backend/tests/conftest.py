@@ -0,0 +1,19 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from src.db.session import async_session
+
+
+@pytest_asyncio.fixture
+async def db_session():
+    """Сессия к базе с применёнными миграциями. Все изменения теста откатываются."""
+    async with async_session() as session:
+        try:
+            await session.execute(text("SELECT 1"))
+        except (OSError, DBAPIError) as err:
+            pytest.skip(f"PostgreSQL is not available: {err}")
+        try:
+            yield session
+        finally:
+            await session.rollback()
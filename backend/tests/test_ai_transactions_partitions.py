@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import postgresql
+from src.crud import ai_transaction_dao
+from src.models import AITransactions
+
+HISTORY_INDEX = 'ix_ai_transactions_user_ai_model_id_created_at'
+
+
+async def create_partition(db_session, month: datetime) -> str:
+    result = await db_session.execute(
+        text("SELECT create_monthly_partition('ai_transactions', CAST(:month AS date))"), {'month': month.date()},
+    )
+    return result.scalar()
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+@pytest.mark.asyncio
+async def test_history_query_uses_index_on_one_partition(db_session):
+    current_time = datetime.now(timezone.utc)
+    month_start = current_time.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    partition = await create_partition(db_session, month_start)
+    # на пустых секциях планировщик выбрал бы полный просмотр, проверяется применимость индекса
+    await db_session.execute(text("SET LOCAL enable_seqscan = off"))
+
+    query = ai_transaction_dao.history_query(uuid.uuid4(), month_start, current_time, token_budget=4000)
+    compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})
+    plan = (await db_session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar()
+    nodes = list(plan_nodes(plan[0]['Plan']))
+
+    assert {node['Relation Name'] for node in nodes if 'Relation Name' in node} == {partition}
+    indexes = [node['Index Name'] for node in nodes if 'Index Name' in node]
+    parents = await db_session.execute(
+        text("SELECT DISTINCT inhparent::regclass::text FROM pg_inherits WHERE inhrelid::regclass::text = ANY(:indexes)"),
+        {'indexes': indexes},
+    )
+    assert parents.scalars().all() == [HISTORY_INDEX]
+
+
+@pytest.mark.asyncio
+async def test_create_monthly_partition_moves_rows_from_default(db_session):
+    created_at = datetime(2099, 1, 15, tzinfo=timezone.utc)
+    row_id = uuid.uuid4()
+    await db_session.execute(insert(AITransactions).values(id=row_id, created_at=created_at, question='q', answer='a'))
+    located = select(text('tableoid::regclass::text')).select_from(AITransactions).where(AITransactions.id == row_id)
+    assert (await db_session.execute(located)).scalar() == 'ai_transactions_default'
+
+    partition = await create_partition(db_session, created_at)
+
+    assert partition == 'ai_transactions_2099_01'
+    assert (await db_session.execute(located)).scalar() == partition
@@ -0,0 +1,51 @@
+import time
+
+import markdown
+import pytest
+from bs4 import BeautifulSoup
+from src.ai.gpt.abc_provider import BaseAIProvider
+from src.ai.gpt.mock_text_generator import contents_markdown, text_markdown
+from src.utils.re_compile import PUNCTUATION_RE
+
+EDGE_CASES = [
+    "x < y and y > z",
+    "Цена 5 $ < 10 $",
+    "```python\nprint(1)\n```",
+    "![img](a.png) text",
+    "[link](http://example.com) text",
+    "<http://example.com> and <a@b.c>",
+    "a <b>bold</b> <br/> <span>in</span> c",
+    "_word_ and __init__ snake_case",
+    "&amp; &lt;tag&gt; in `&amp;` and `<b>`",
+    "# 1. Title\n\n1. one\n2. two\n\n> 3. quoted",
+    "text\n1. not a list\n1) neither",
+    "<div>\n<script>\nvar x = 1;\n</script>\nafter\n</div>",
+]
+
+
+def reference_words(text: str, word_limit: int = 15) -> set:
+    """Прежняя реализация через `markdown` и `BeautifulSoup`."""
+    clean_text = BeautifulSoup(markdown.markdown(text), "html.parser").get_text()
+    return set(PUNCTUATION_RE.sub('', clean_text).split()[:word_limit])
+
+
+@pytest.mark.parametrize('word_limit', [15, 10 ** 6])
+@pytest.mark.parametrize('text', text_markdown + [contents_markdown] + EDGE_CASES)
+def test_matches_markdown_reference(text, word_limit):
+    assert BaseAIProvider.clean_and_split_text(text, word_limit) == reference_words(text, word_limit)
+
+
+def test_faster_than_markdown_reference():
+    corpus = text_markdown * 20
+
+    start = time.perf_counter()
+    for text in corpus:
+        reference_words(text)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in corpus:
+        BaseAIProvider.clean_and_split_text(text)
+    clean_time = time.perf_counter() - start
+
+    assert clean_time * 5 < reference_time
@@ -0,0 +1,136 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from src.ai.gpt import history_writer as history_writer_module
+from src.ai.gpt.context_cache import ConversationCache
+from src.ai.gpt.history_writer import HistoryWriter
+from src.conf.redis import AsyncRedisClient
+from src.models import UserAIModel
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def __getattr__(self, name):
+        async def command(*args):
+            self.commands.append((name, args))
+            return self
+        return command
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class FakeRedis:
+    """Списки и хеши Redis в памяти для команд кеша диалога."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    async def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    async def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    async def rpushx(self, key, value):
+        return await self.rpush(key, value) if key in self.data else 0
+
+    async def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    async def renamenx(self, source, destination):
+        if destination in self.data:
+            return False
+        self.data[destination] = self.data.pop(source)
+        return True
+
+    async def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+
+    async def hdel(self, key, field):
+        return int(self.data.get(key, {}).pop(field, None) is not None)
+
+    async def hvals(self, key):
+        return list(self.data.get(key, {}).values())
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(AsyncRedisClient, 'get_client', lambda: redis)
+    return redis
+
+
+@pytest.fixture
+def user_ai_model():
+    return UserAIModel(id=uuid.uuid4(), model_id=uuid.uuid4(), time_start=datetime.now(timezone.utc) - timedelta(days=1))
+
+
+def make_turn(number: int, user_ai_model: UserAIModel) -> dict:
+    return {
+        'id': uuid.uuid4(), 'user_ai_model_id': user_ai_model.id,
+        'question': f'question {number}', 'question_tokens': 10, 'answer': f'answer {number}', 'answer_tokens': 10,
+        'created_at': datetime.now(timezone.utc),
+    }
+
+
+@pytest.mark.asyncio
+async def test_fill_includes_turns_not_yet_saved(redis, user_ai_model):
+    saved, queued = make_turn(0, user_ai_model), make_turn(1, user_ai_model)
+    writer_cache = ConversationCache(user_ai_model)
+    # ход поставлен в очередь записи, кеш ещё не прогрет, поэтому в список он не попал
+    await writer_cache.add_pending(queued)
+    await writer_cache.append(queued, context_window=8000)
+
+    await ConversationCache(user_ai_model).fill([saved])
+
+    history = await ConversationCache(user_ai_model).get()
+    assert [item['question'] for item in history] == ['question 0', 'question 1']
+
+
+@pytest.mark.asyncio
+async def test_fill_skips_pending_turns_already_read_from_database(redis, user_ai_model):
+    turn = make_turn(0, user_ai_model)
+    cache = ConversationCache(user_ai_model)
+    await cache.add_pending(turn)
+
+    await cache.fill([turn])
+
+    assert [item['question'] for item in await cache.get()] == ['question 0']
+
+
+@pytest.mark.asyncio
+async def test_writer_releases_pending_turns_after_flush(redis, user_ai_model, monkeypatch):
+    class FakeHistoryDAO:
+        async def create_history_batch(self, *, rows, db_session):
+            pass
+
+    async def fake_session():
+        yield None
+
+    monkeypatch.setattr(history_writer_module, 'ai_transaction_dao', FakeHistoryDAO())
+    monkeypatch.setattr(history_writer_module, 'get_async_session', fake_session)
+    turn = make_turn(0, user_ai_model)
+    cache = ConversationCache(user_ai_model)
+    await cache.add_pending(turn)
+
+    await HistoryWriter()._flush([turn])
+
+    assert await redis.hvals(cache.pending_key) == []
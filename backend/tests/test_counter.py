@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import Float, cast, column, select, table, text
+from sqlalchemy.dialects import postgresql
+from src.db.counter import RowCounter
+from src.models import AITransactions
+
+
+class FakeSession:
+    """Сессия, отвечающая на любой запрос числом строк."""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def scalar(self):
+        return self.count
+
+
+@pytest.mark.asyncio
+async def test_estimated_counts_exactly_when_query_has_no_literal_form():
+    items = table('items', column('id'), column('data', postgresql.JSONB))
+    session = FakeSession(3)
+
+    assert await RowCounter.estimated(select(items.c.id).where(items.c.data == {'a': 1}), session) == 3
+    assert len(session.statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_estimated_counts_exactly_when_explain_is_rejected(db_session):
+    # бесконечность выводится литералом `inf`, который база не принимает, а параметром передаётся
+    query = select(AITransactions.id).where(cast(AITransactions.question_tokens, Float) < float('inf'))
+
+    assert await RowCounter.estimated(query, db_session) == await RowCounter.exact(query, db_session)
+    assert (await db_session.execute(text("SELECT 1"))).scalar() == 1
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import exc
+from src.ai.gpt import history_writer as history_writer_module
+from src.ai.gpt.history_writer import HistoryWriter
+from src.utils.metrics import Metrics
+
+
+class FakeHistoryDAO:
+    """Принимает пачку целиком или отклоняет её, если в ней есть строка с пустым вопросом."""
+
+    def __init__(self):
+        self.saved: list[dict] = []
+        self.calls = 0
+
+    async def create_history_batch(self, *, rows: list[dict], db_session) -> None:
+        self.calls += 1
+        if any(row['question'] is None for row in rows):
+            raise exc.IntegrityError("INSERT", {}, Exception("null value in column \"question\""))
+        self.saved.extend(rows)
+
+
+async def fake_session():
+    yield None
+
+
+@pytest.fixture
+def dao(monkeypatch):
+    dao = FakeHistoryDAO()
+    monkeypatch.setattr(history_writer_module, 'ai_transaction_dao', dao)
+    monkeypatch.setattr(history_writer_module, 'get_async_session', fake_session)
+    return dao
+
+
+@pytest.mark.asyncio
+async def test_flush_loses_only_bad_rows(dao):
+    rows = [{'id': i, 'question': None if i in (3, 6) else f'q{i}'} for i in range(8)]
+    lost = Metrics.snapshot()['counters'].get('history_writer.lost_rows', 0)
+
+    await HistoryWriter()._flush(rows)
+
+    assert sorted(row['id'] for row in dao.saved) == [0, 1, 2, 4, 5, 7]
+    assert Metrics.snapshot()['counters']['history_writer.lost_rows'] - lost == 2
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_good_batch_once(dao):
+    rows = [{'id': i, 'question': f'q{i}'} for i in range(8)]
+
+    await HistoryWriter()._flush(rows)
+
+    assert dao.saved == rows
+    assert dao.calls == 1
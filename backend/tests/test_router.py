@@ -0,0 +1,186 @@
+import asyncio
+import json
+import uuid
+
+import openai
+import pytest
+import pytest_asyncio
+from redis.asyncio import Redis
+from src.ai.gpt.clients import OpenAIClientRegistry
+from src.ai.gpt.open_ai import OpenAIProvider
+from src.ai.gpt.router import ProviderRouter
+from src.conf import settings
+from src.conf.fastapi import ModeEnum
+from src.conf.redis import AsyncRedisClient
+from src.models.ai_model import AIModels
+
+
+class FakeOpenAIServer:
+    """OpenAI-совместимый HTTP-сервер на локальном порту с заданными задержкой и кодом ответа."""
+
+    def __init__(self, name: str, delay: float = 0, status: int = 200):
+        self.name = name
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        self.server: asyncio.Server | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        headers = await reader.readuntil(b'\r\n\r\n')
+        length = next(
+            int(line.split(b':', 1)[1]) for line in headers.split(b'\r\n') if line.lower().startswith(b'content-length')
+        )
+        await reader.readexactly(length)
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.status == 200:
+            body = {
+                'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': self.name,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': self.name}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+            }
+        else:
+            body = {'error': {'message': self.name, 'type': 'server_error', 'code': None}}
+        payload = json.dumps(body).encode()
+        writer.write(
+            f"HTTP/1.1 {self.status} Status\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+        writer.close()
+
+
+def make_model(server: FakeOpenAIServer) -> AIModels:
+    return AIModels(id=uuid.uuid4(), title_model=server.name, api_key='test', base_url=server.base_url)
+
+
+async def request(model: AIModels):
+    client = OpenAIClientRegistry.get_client(model.api_key, None, model.base_url).with_options(max_retries=0)
+    completion = await client.chat.completions.create(model=model.title_model, messages=[{'role': 'user', 'content': 'ping'}])
+    return completion.choices[0].message.content
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def clients(monkeypatch):
+    monkeypatch.setattr(settings, 'GPT_HEDGE_DEFAULT_DELAY_MS', 100)
+    yield
+    await OpenAIClientRegistry.close()
+
+
+@pytest.mark.asyncio
+async def test_primary_answers():
+    async with FakeOpenAIServer('primary') as primary, FakeOpenAIServer('backup') as backup:
+        model, answer = await ProviderRouter.execute(make_model(primary), make_model(backup), request, OpenAIProvider.is_retriable)
+
+    assert (model.title_model, answer) == ('primary', 'primary')
+    assert backup.requests == 0
+
+
+@pytest.mark.asyncio
+async def test_failover_on_server_error():
+    async with FakeOpenAIServer('primary', status=503) as primary, FakeOpenAIServer('backup') as backup:
+        model, answer = await ProviderRouter.execute(make_model(primary), make_model(backup), request, OpenAIProvider.is_retriable)
+
+    assert answer == 'backup'
+    assert primary.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_retried():
+    async with FakeOpenAIServer('primary', status=400) as primary, FakeOpenAIServer('backup') as backup:
+        with pytest.raises(openai.BadRequestError):
+            await ProviderRouter.execute(make_model(primary), make_model(backup), request, OpenAIProvider.is_retriable)
+
+    assert backup.requests == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_over_slow_primary():
+    async with FakeOpenAIServer('primary', delay=2) as primary, FakeOpenAIServer('backup') as backup:
+        primary_model = make_model(primary)
+        model, answer = await ProviderRouter.execute(primary_model, make_model(backup), request, OpenAIProvider.is_retriable)
+
+    assert answer == 'backup'
+    assert not ProviderRouter.get_stats(primary_model).latencies
+
+
+@pytest.mark.asyncio
+async def test_cancel_before_hedge_cancels_primary():
+    async with FakeOpenAIServer('primary', delay=0.3) as primary, FakeOpenAIServer('backup') as backup:
+        primary_model = make_model(primary)
+        task = asyncio.create_task(
+            ProviderRouter.execute(primary_model, make_model(backup), request, OpenAIProvider.is_retriable, hedge=False)
+        )
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.4)
+
+    stats = ProviderRouter.get_stats(primary_model)
+    assert not stats.latencies and stats.error_ewma == 0
+    assert backup.requests == 0
+
+
+class FakeRateLimiter:
+    """Записывает резервы и сверки токенов по моделям."""
+
+    def __init__(self):
+        self.acquired: list[str] = []
+        self.reconciled: dict[str, int] = {}
+
+    async def acquire(self, model: AIModels, tokens: int) -> int:
+        self.acquired.append(model.title_model)
+        return tokens
+
+    async def reconcile(self, model: AIModels, reserved: int, used: int) -> None:
+        self.reconciled[model.title_model] = used
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setattr(settings, 'MODE', ModeEnum.production)
+    monkeypatch.setattr(settings, 'SOCKS5', None)
+    monkeypatch.setattr(AsyncRedisClient, '_client', Redis())
+    provider = OpenAIProvider(query_text='ping', user=None, chat_id=1, creativity_controls={'max_tokens': 10})
+    provider.all_prompt = [{'role': 'user', 'content': 'ping'}]
+    provider.rate_limiter = FakeRateLimiter()
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_reserves_tokens_of_each_model(provider):
+    async with FakeOpenAIServer('primary', delay=2) as primary, FakeOpenAIServer('backup') as backup:
+        model, completion = await ProviderRouter.execute(
+            make_model(primary), make_model(backup), provider.create_completion, OpenAIProvider.is_retriable
+        )
+        await asyncio.sleep(0.1)
+
+    assert model.title_model == 'backup'
+    assert sorted(provider.rate_limiter.acquired) == ['backup', 'primary']
+    # отменённый запрос к основной модели возвращает весь резерв
+    assert provider.rate_limiter.reconciled == {'backup': 2, 'primary': 0}
+
+
+@pytest.mark.asyncio
+async def test_failover_reserves_tokens_of_fallback_model(provider):
+    async with FakeOpenAIServer('primary', status=503) as primary, FakeOpenAIServer('backup') as backup:
+        await ProviderRouter.execute(
+            make_model(primary), make_model(backup), provider.create_completion, OpenAIProvider.is_retriable, hedge=False
+        )
+
+    assert provider.rate_limiter.acquired == ['primary', 'backup']
+    assert provider.rate_limiter.reconciled == {'primary': 0, 'backup': 2}
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from src.ai.gpt.stream_log import StreamLog
+from src.ai.gpt.streaming import DeltaWebSocketStreamer, WebSocketStreamer
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+
+
+class FakeManager:
+    def __init__(self):
+        self.frames = []
+
+    async def send_message_to_chat(self, frame, chat_id, droppable=False):
+        self.frames.append(frame)
+
+
+class FakeRedis:
+    """Журнал в памяти: XADD через `StreamLog.append` подменяется, XRANGE читает записанные кадры."""
+
+    def __init__(self):
+        self.entries = []
+        self.release = asyncio.Event()
+
+    async def append(self, frames):
+        await self.release.wait()
+        self.entries.extend(json.dumps(frame) for frame in frames)
+
+    async def get(self, key):
+        return None
+
+    async def xrange(self, key):
+        return [(index, {'frame': frame}) for index, frame in enumerate(self.entries)]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(settings, 'WS_STREAM_LOG_ENABLED', True)
+    monkeypatch.setattr(StreamLog, 'append', redis.append)
+    monkeypatch.setattr(AsyncRedisClient, 'get_client', lambda: redis)
+    return redis
+
+
+async def stream(streamer: WebSocketStreamer, parts: list[str]) -> None:
+    text = ''
+    for part in parts:
+        text += part
+        await streamer.push(part, text)
+    await streamer.finish(text)
+
+
+@pytest.mark.asyncio
+async def test_full_text_frames_are_logged_as_deltas_off_the_send_path(redis):
+    manager = FakeManager()
+    streamer = WebSocketStreamer(manager, uuid.uuid4())
+
+    await stream(streamer, ['a', 'b', 'c'])
+
+    # запись в журнал ещё ждёт Redis, а все кадры уже отправлены
+    assert [frame['message'] for frame in manager.frames] == ['a', 'ab', 'abc', '']
+    assert redis.entries == []
+
+    redis.release.set()
+    await streamer.log_task
+
+    logged = [json.loads(entry) for entry in redis.entries]
+    # части, пришедшие пока запись ждала Redis, объединены в одну запись
+    assert [(frame['seq'], frame['message'], frame['is_start']) for frame in logged] == [(2, 'abc', True), (3, '', False)]
+
+    replayed = await StreamLog.replay(streamer.chat_id, streamer.generation_id, last_seq=0)
+    assert [(frame['seq'], frame['message'], frame['is_start']) for frame in replayed] == [(2, 'abc', False), (3, '', False)]
+
+
+@pytest.mark.asyncio
+async def test_delta_frames_are_replayed_after_last_seq(redis):
+    redis.release.set()
+    streamer = DeltaWebSocketStreamer(FakeManager(), uuid.uuid4())
+
+    for part in ['a', 'b', 'c']:
+        streamer.buffer.append(part)
+        await streamer.flush()
+    await streamer.finish('abc')
+    await streamer.log_task
+
+    replayed = await StreamLog.replay(streamer.chat_id, streamer.generation_id, last_seq=0)
+    assert [(frame['seq'], frame['message']) for frame in replayed] == [(1, 'b'), (2, 'c'), (3, 'abc')]
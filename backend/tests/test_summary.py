@@ -0,0 +1,101 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from redis.asyncio import Redis
+from src.ai.gpt import abc_provider
+from src.ai.gpt.context_cache import ConversationCache
+from src.ai.gpt.open_ai import OpenAIProvider
+from src.ai.gpt.summarizer import ConversationSummarizer
+from src.conf import settings
+from src.conf.redis import AsyncRedisClient
+from src.models import AISummary, UserAIModel
+from src.models.ai_model import AIModels, GPTPrompt
+
+
+def make_turn(number: int, created_at: datetime, tokens: int = 10) -> dict:
+    return {
+        'question': f'question {number}', 'question_tokens': tokens,
+        'answer': f'answer {number}', 'answer_tokens': tokens,
+        'created_at': created_at,
+    }
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    # клиент Redis без соединения: кеш диалога и блокировка сводки подменяются в тестах
+    monkeypatch.setattr(AsyncRedisClient, '_client', Redis())
+    model = AIModels(id=uuid.uuid4(), title_model='gpt-4o', context_window=8000, max_request_token=4000)
+    provider = OpenAIProvider(query_text='new question', user=None, chat_id=1)
+    provider.model = model
+    provider.active_model = UserAIModel(id=uuid.uuid4(), model=model, time_start=datetime.now(timezone.utc) - timedelta(days=1))
+    provider.assist_prompt = GPTPrompt(en_prompt_text='system prompt')
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_get_prompt_puts_summary_before_turns_after_it(provider, monkeypatch):
+    now = datetime.now(timezone.utc)
+    history = [make_turn(number, now - timedelta(minutes=10 - number)) for number in range(5)]
+    summary = AISummary(summary='earlier turns', summary_tokens=100, summarized_until=history[2]['created_at'])
+
+    async def get_summary(session):
+        return summary
+
+    async def cached_history(cache):
+        return history
+
+    monkeypatch.setattr(provider, 'get_summary', get_summary)
+    monkeypatch.setattr(ConversationCache, 'get', cached_history)
+
+    await provider.get_prompt(session=None)
+
+    assert provider.all_prompt == [
+        {'role': 'system', 'content': 'system prompt'},
+        {'role': 'system', 'content': 'Summary of the earlier conversation:\nearlier turns'},
+        {'role': 'user', 'content': 'question 3'},
+        {'role': 'assistant', 'content': 'answer 3'},
+        {'role': 'user', 'content': 'question 4'},
+        {'role': 'assistant', 'content': 'answer 4'},
+        {'role': 'user', 'content': 'new question'},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_schedule_summary_releases_lock_when_enqueue_fails(provider, monkeypatch):
+    monkeypatch.setattr(settings, 'GPT_SUMMARY_ENABLED', True)
+    provider.query_text_tokens = provider.model.context_window
+    unlocked = []
+
+    async def lock(user_ai_model_id):
+        return True
+
+    async def unlock(user_ai_model_id):
+        unlocked.append(user_ai_model_id)
+
+    async def kiq(**kwargs):
+        raise ConnectionError("broker is unavailable")
+
+    monkeypatch.setattr(ConversationSummarizer, 'lock', lock)
+    monkeypatch.setattr(ConversationSummarizer, 'unlock', unlock)
+    monkeypatch.setattr(abc_provider.summarize_conversation_task, 'kiq', kiq)
+
+    with pytest.raises(ConnectionError):
+        await provider.schedule_summary()
+
+    assert unlocked == [provider.active_model.id]
+
+
+def test_take_turns_splits_history_into_chunks():
+    now = datetime.now(timezone.utc)
+    history = [make_turn(number, now, tokens=100) for number in range(5)]
+
+    chunks = []
+    pending = history
+    while pending:
+        chunk = ConversationSummarizer.take_turns(pending, token_budget=500)
+        chunks.append(chunk)
+        pending = pending[len(chunk):]
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert ConversationSummarizer.take_turns([make_turn(0, now, tokens=1000)], token_budget=500) == [make_turn(0, now, tokens=1000)]
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from src.tgbot.services.typing_scheduler import TypingScheduler
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = TypingScheduler()
+    scheduler.sent = []
+    monkeypatch.setattr(scheduler, 'TICK', 0.01)
+
+    async def send(chat_id):
+        scheduler.sent.append(chat_id)
+
+    monkeypatch.setattr(scheduler, 'send', send)
+    return scheduler
+
+
+@pytest.mark.asyncio
+async def test_expired_request_does_not_remove_later_request(scheduler):
+    expired = scheduler.add(1, max_time=0.02)
+    await asyncio.sleep(0.1)
+    assert 1 not in scheduler.chats
+
+    active = scheduler.add(1, max_time=10)
+    scheduler.remove(1, expired)
+    assert list(scheduler.chats[1]['requests']) == [active]
+
+    scheduler.remove(1, active)
+    assert 1 not in scheduler.chats
+
+
+@pytest.mark.asyncio
+async def test_chat_stays_until_last_request_is_removed(scheduler):
+    first = scheduler.add(1, max_time=10)
+    second = scheduler.add(1, max_time=10)
+    await asyncio.sleep(0.05)
+
+    scheduler.remove(1, first)
+    assert 1 in scheduler.chats
+    scheduler.remove(1, second)
+    assert 1 not in scheduler.chats
+    await scheduler._task
+    assert scheduler.sent == [1]